@@ -1,25 +1,58 @@
-import RPi.GPIO as GPIO
+import logging
+import os
+import sys
 import time
-import pandas as pd  # For handling Excel files
+import gzip
+import hashlib
+import json
+import csv
+import io
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from datetime import datetime
+from relay import ring_bell, relay_status
+import control
+from schedule_store import open_store
+from watcher import file_signature
+from snapshot import read_generation
+from event_log import EventLog
+from log_config import setup_logging
+import metrics
+import profiling
+from normalize import parse_date, parse_short_date, parse_time, format_date, format_time
+
+logger = logging.getLogger("app")
+
+DISPLAY_SECONDS = metrics.histogram("app_display_seconds", "Time to answer a /display request")
+STATE_FILE_BYTES = metrics.gauge("bell_state_file_bytes", "Size of the schedule state files")
+METRICS_AGE = metrics.gauge("bell_metrics_age_seconds", "Seconds since each daemon last published its metrics")
+STATE_FILES = ['input.txt', 'final.txt', 'bell_events.csv', 'fire_table.bin', 'timers.json']
 
-GPIO.setmode(GPIO.BCM)  # Use BCM numbering
-GPIO.setup(4, GPIO.OUT)  # Set pin 14 as output for relay
 def relay_trigger():
-    # Trigger the relay for 5 seconds
-    GPIO.output(4, GPIO.HIGH)  # Turn the relay on
-    time.sleep(5)  # Keep the relay on for 5 seconds
-    GPIO.output(4, GPIO.LOW)  # Turn the relay off
+    # Ask the relay daemon to ring for 5 seconds, returns without waiting for the bell
+    return ring_bell(5, source="app")
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
+store = open_store()  # Shared SQLite schedule store, None when BELL_DB is not set
+
+# input.txt with duplicate submissions filtered out, appends are locked against compaction
+event_log = EventLog('input.txt')
 
-# Function to log data to a file
-def log_to_file(filename, data):
-    with open(filename, 'a') as file:
-        file.write(data + '\n')
+# Function to record a submitted event, in the SQLite store when BELL_DB is set, else in input.txt
+def log_event(data):
+    log_events([data])
+
+# Function to record a batch of events at once: one transaction, or one append + fsync of input.txt
+# Returns how many lines were skipped as repeats of what is already logged
+def log_events(lines):
+    if store is not None:
+        store.add_events(lines)
+        return 0
+    written, skipped = event_log.append(lines)
+    if skipped:
+        logger.info(f"Skipped {skipped} repeated event(s)")
+    return skipped
 
 # Function to format received data
 def format_data(data):
@@ -29,18 +62,15 @@ def format_data(data):
         # Case 1: {mode: '0', date: 'dd/mm/yyyy'}
         if mode == '0' and "date" in data:
             date_str = data.get("date")
-            date_obj = datetime.strptime(date_str, "%d/%m/%Y")
-            formatted_date = date_obj.strftime("%d-%m-%Y")
+            formatted_date = format_date(parse_date(date_str, "/"))
             return f"{mode},{formatted_date}"
 
         # **Fixed Case 2**: {mode: '0', startDate: 'dd/mm/yyyy', endDate: 'dd/mm/yyyy'}
         elif mode == '0' and "startDate" in data and "endDate" in data:
             start_date_str = data.get("startDate")
             end_date_str = data.get("endDate")
-            start_date_obj = datetime.strptime(start_date_str, "%d/%m/%Y")
-            end_date_obj = datetime.strptime(end_date_str, "%d/%m/%Y")
-            formatted_start_date = start_date_obj.strftime("%d-%m-%Y")
-            formatted_end_date = end_date_obj.strftime("%d-%m-%Y")
+            formatted_start_date = format_date(parse_date(start_date_str, "/"))
+            formatted_end_date = format_date(parse_date(end_date_str, "/"))
             return f"{mode},{formatted_start_date},{formatted_end_date}"
 
         # Case 3: {mode: '1', slot: 'X', start date: 'dd/mm/yyyy', end date: 'dd/mm/yyyy', start_time: 'hh:mm:ss'}
@@ -49,12 +79,9 @@ def format_data(data):
             start_date_str = data.get("start date")
             end_date_str = data.get("end date")
             start_time_str = data.get("start_time")
-            start_date_obj = datetime.strptime(start_date_str, "%d/%m/%Y")
-            end_date_obj = datetime.strptime(end_date_str, "%d/%m/%Y")
-            start_time_obj = datetime.strptime(start_time_str, "%H:%M:%S")
-            formatted_start_date = start_date_obj.strftime("%d-%m-%Y")
-            formatted_end_date = end_date_obj.strftime("%d-%m-%Y")
-            formatted_start_time = start_time_obj.strftime("%H:%M:%S")
+            formatted_start_date = format_date(parse_date(start_date_str, "/"))
+            formatted_end_date = format_date(parse_date(end_date_str, "/"))
+            formatted_start_time = format_time(parse_time(start_time_str))
             return f"{mode},{slot},{formatted_start_date},{formatted_end_date},{formatted_start_time}"
 
         # **Fixed Case 4**: {mode: '2', slot: 'X', date: {list of 'dd/mm/yyyy'}, start_time: 'hh:mm:ss'}
@@ -74,13 +101,11 @@ def format_data(data):
             # Format all dates and sort them
             formatted_dates = []
             for date_str in dates:
-                date_obj = datetime.strptime(date_str, "%d/%m/%y")  # Adjust for two-digit year
-                formatted_dates.append(date_obj.strftime("%d-%m-%Y"))
+                formatted_dates.append(format_date(parse_short_date(date_str)))  # Two-digit year
 
             # Sort dates for consistent order and join with commas
             formatted_dates_str = ",".join(sorted(formatted_dates))
-            start_time_obj = datetime.strptime(start_time_str, "%H:%M:%S")
-            formatted_start_time = start_time_obj.strftime("%H:%M:%S")
+            formatted_start_time = format_time(parse_time(start_time_str))
             return f"{mode},{slot},{formatted_dates_str},{formatted_start_time}"
 
     # Return None if the format is not recognized
@@ -89,96 +114,320 @@ def format_data(data):
 @app.route('/holiday', methods=['GET', 'POST'])
 def handle_holiday():
     data = request.json
-    print('Holiday Data Received:', data)
+    logger.info('Holiday Data Received: %s', data)
     formatted_data = format_data(data)
     if formatted_data:
-        log_to_file('input.txt', formatted_data)
+        log_event(formatted_data)
     else:
-        log_to_file('input.txt', str(data))
+        log_event(str(data))
     return jsonify({"status": "success", "message": "Holiday data received"}), 200
 
 @app.route('/midsem', methods=['GET', 'POST'])
 def handle_midsem():
     data = request.json
-    print('Midsem Data Received:', data)
+    logger.info('Midsem Data Received: %s', data)
     formatted_data = format_data(data)
     if formatted_data:
-        log_to_file('input.txt', formatted_data)
+        log_event(formatted_data)
     else:
-        log_to_file('input.txt', str(data))
+        log_event(str(data))
     return jsonify({"status": "success", "message": "Midsem data received"}), 200
 
 @app.route('/endsem', methods=['GET', 'POST'])
 def handle_endsem():
     data = request.json
-    print('Endsem Data Received:', data)
+    logger.info('Endsem Data Received: %s', data)
     formatted_data = format_data(data)
     if formatted_data:
-        log_to_file('input.txt', formatted_data)
+        log_event(formatted_data)
     else:
-        log_to_file('input.txt', str(data))
+        log_event(str(data))
     return jsonify({"status": "success", "message": "Endsem data received"}), 200
 
 @app.route('/emergency', methods=['GET', 'POST'])
 def handle_emergency():
     data = request.json
-    print('Emergency Signal Received:', data)
+    logger.warning('Emergency Signal Received: %s', data)
     formatted_data = format_data(data)
-   # if formatted_data:
-   #    log_to_file('input.txt', formatted_data)
-   # else:
-   #    log_to_file('input.txt', str(data))
 
-    relay_trigger()
+    # Only queue the pulse, the relay daemon rings it and merges repeated clicks into one pulse
+    try:
+        ticket = relay_trigger()
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        return jsonify({"status": "error", "message": f"Relay daemon not running, bell not rung: {e}"}), 503
+    except OSError as e:
+        # The daemon may have queued the pulse anyway, so this is not retried
+        return jsonify({"status": "error", "message": f"No reply from the relay daemon: {e}"}), 504
 
-    return jsonify({"status": "success", "message": "Emergency signal received"}), 200
+    return jsonify({
+        "status": "accepted",
+        "message": "Emergency signal received",
+        "ticket": ticket["ticket"],
+        "coalesced": ticket["coalesced"],
+        "status_url": f"/emergency/{ticket['ticket']}",
+    }), 202
 
-@app.route('/display', methods=['GET', 'POST'])
-def display_data():
+@app.route('/emergency/<ticket_id>', methods=['GET'])
+def emergency_status(ticket_id):
+    try:
+        ticket = relay_status(ticket_id)
+    except OSError as e:
+        return jsonify({"status": "error", "message": f"Relay daemon not reachable: {e}"}), 503
+    if not ticket or ticket.get("status") == "error":
+        return jsonify({"status": "error", "message": "Unknown ticket"}), 404
+    return jsonify(ticket), 200
+
+IMPORT_MAX_ROWS = 10000  # Largest timetable accepted in one /import request
+IMPORT_MAX_ERRORS = 100  # Row errors listed in the response, the rest are only counted
+IMPORT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+}
+
+def import_cell(key, value, mode):
+    """
+    Turns one spreadsheet cell into the string format_data expects.
+    Excel hands dates and times over as datetime/time objects and numbers as int/float.
+    """
+    if isinstance(value, datetime):
+        if key == "start_time":
+            return value.strftime("%H:%M:%S")
+        return value.strftime("%d/%m/%y" if mode == "2" else "%d/%m/%Y")  # Mode 2 dates use two-digit years
+    if hasattr(value, "strftime"):
+        return value.strftime("%H:%M:%S")
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+def import_payload(row):
+    """
+    Converts a CSV/XLSX row (column name -> cell) into the same dict a /holiday,
+    /midsem or /endsem request would carry. Mode 2 dates are separated by ';'.
+    """
+    row = {key.strip(): value for key, value in row.items() if key is not None and value not in (None, "")}
+    mode = import_cell("mode", row.get("mode", ""), None)
+    payload = {key: import_cell(key, value, mode) for key, value in row.items()}
+    if payload.get("mode") == "2" and isinstance(payload.get("date"), str):
+        payload["date"] = [d.strip() for d in payload["date"].split(";") if d.strip()]
+    return payload
+
+def iter_import_rows(import_format, stream):
+    """
+    Yields (row number, payload) for each row of the uploaded timetable without reading
+    CSV or NDJSON into memory first. Row numbers match the line/row in the source file.
+    """
+    if import_format == "csv":
+        reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+        for row in reader:
+            yield reader.line_num, import_payload(row)
+    elif import_format == "ndjson":
+        for number, line in enumerate(io.TextIOWrapper(stream, encoding="utf-8"), start=1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except ValueError as e:
+                    yield number, e
+    elif import_format == "xlsx":
+        # Only the import needs openpyxl, so it is not loaded at startup
+        from openpyxl import load_workbook
+        workbook = load_workbook(stream if stream.seekable() else io.BytesIO(stream.read()), read_only=True, data_only=True)
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else None for cell in next(rows, ())]
+        for number, cells in enumerate(rows, start=2):
+            if any(cell not in (None, "") for cell in cells):
+                yield number, import_payload(dict(zip(header, cells)))
+        workbook.close()
+
+@app.route('/import', methods=['POST'])
+def handle_import():
+    """
+    Bulk import of a timetable as CSV, XLSX or NDJSON, either as the raw request body
+    or as a multipart upload named "file". Every row is validated with format_data;
+    the valid ones are stored in one go. With ?strict=1 nothing is stored if any row fails.
+    """
+    upload = request.files.get("file")
+    stream = upload.stream if upload else request.stream
+    import_format = request.args.get("format")
+    if not import_format and upload and upload.filename:
+        import_format = os.path.splitext(upload.filename)[1].lstrip(".").lower()
+    if not import_format:
+        import_format = IMPORT_CONTENT_TYPES.get(request.mimetype)
+    if import_format == "jsonl":
+        import_format = "ndjson"
+    if import_format not in ("csv", "ndjson", "xlsx"):
+        return jsonify({"status": "error", "message": "Unsupported format, use csv, xlsx or ndjson"}), 415
+    strict = request.args.get("strict", "").lower() in ("1", "true", "yes")
+
+    lines = []
+    errors = []
+    error_count = 0
     try:
-        # Define the file path to the CSV
-        file_path = "bell_events.csv"
+        for number, payload in iter_import_rows(import_format, stream):
+            if len(lines) + error_count >= IMPORT_MAX_ROWS:
+                return jsonify({"status": "error", "message": f"More than {IMPORT_MAX_ROWS} rows, split the file"}), 413
+            try:
+                if isinstance(payload, Exception):
+                    raise payload
+                formatted_data = format_data(payload)
+                if not formatted_data:
+                    raise ValueError("Unrecognised row, check mode and the required columns")
+                lines.append(formatted_data)
+            except (ValueError, TypeError) as e:
+                error_count += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({"row": number, "error": str(e)})
+    except ImportError:
+        return jsonify({"status": "error", "message": "XLSX import needs openpyxl (pip install openpyxl)"}), 501
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"Could not read the {import_format} file: {e}"}), 400
+
+    if error_count and strict:
+        return jsonify({"status": "error", "message": "Nothing imported, some rows are invalid",
+                        "imported": 0, "rejected": error_count, "errors": errors}), 422
+    duplicates = log_events(lines) if lines else 0
+    logger.info(f"Imported {len(lines)} events ({error_count} rejected) from {import_format}")
+    return jsonify({"status": "success" if not error_count else "partial", "imported": len(lines),
+                    "duplicates": duplicates, "rejected": error_count, "errors": errors}), 200
 
-        # Load the CSV file into a DataFrame
-        df = pd.read_csv(file_path)
+display_file = "bell_events.csv"
+manifest_file = "snapshot.json"
+display_cache = {"signature": None, "generation": None}  # Parsed /display rows, reused until bell_events.csv changes
+DISPLAY_MAX_PER_PAGE = 500
+GZIP_MIN_BYTES = 500  # Smaller responses are not worth compressing
+
+def load_display_rows(file_path):
+    """
+    Returns the cached /display rows, parsing the CSV again only when a new snapshot
+    generation was compiled (or the file was replaced some other way).
+    """
+    signature = file_signature(file_path)
+    if signature is None:
+        raise FileNotFoundError(file_path)
+    generation = read_generation(manifest_file)
+    if display_cache["signature"] == signature and display_cache["generation"] == generation:
+        return display_cache
+
+    # The csv module is enough for three columns and keeps pandas out of the server's startup and memory
+    with open(file_path, 'r', newline='') as file:
+        reader = csv.DictReader(file)
+        if reader.fieldnames is None:
+            raise EOFError("CSV file is empty")
 
         # Check if required columns exist
         required_columns = ["Type", "Date", "Timings"]
         for column in required_columns:
-            if column not in df.columns:
-                return jsonify({"status": "error", "message": f"Missing column: {column}"}), 500
+            if column not in reader.fieldnames:
+                raise ValueError(f"Missing column: {column}")
+        records = list(reader)
 
-        # Convert the DataFrame to a list of dictionaries
-        data_json = []
-        for _, row in df.iterrows():
-            # Format the 'Date' column to ensure consistency
-            try:
-                date_value = datetime.strptime(row["Date"], "%d-%m-%Y").strftime("%d-%m-%Y")
-            except ValueError:
-                date_value = row["Date"]  # Keep original value if formatting fails
-
-            # Append each row as a dictionary
-            event = {
-                "type": row["Type"],
-                "date": date_value,
-                "slot_times": row["Timings"]
-            }
-            data_json.append(event)
-        # print(data_json)
-
-        # Return the JSON response
-        return jsonify(data_json), 200
+    rows = []
+    days = []  # Parsed date of every row, used by the from/to filters
+    for row in records:
+        # Format the 'Date' column to ensure consistency
+        try:
+            day = parse_date(row["Date"]).date()
+            date_value = format_date(day)
+        except (TypeError, ValueError):
+            day = None
+            date_value = row["Date"]  # Keep original value if formatting fails
+
+        rows.append({
+            "type": row["Type"],
+            "date": date_value,
+            "slot_times": row["Timings"]
+        })
+        days.append(day)
+
+    body = json.dumps(rows).encode()
+    display_cache.update(
+        signature=signature,
+        generation=generation,
+        rows=rows,
+        days=days,
+        body=body,
+        gzip_body=None,
+        etag=hashlib.sha1(body).hexdigest(),
+        last_modified=int(signature[2] / 1e9),
+    )
+    return display_cache
+
+def parse_display_filters(args):
+    """
+    Reads the optional from/to (dd-mm-yyyy), type (comma separated) and page/per_page parameters.
+    Raises ValueError for malformed values.
+    """
+    date_from = parse_date(args["from"]).date() if "from" in args else None
+    date_to = parse_date(args["to"]).date() if "to" in args else None
+    types = {t.strip().lower() for t in args["type"].split(",")} if "type" in args else None
+    page = int(args.get("page", 1))
+    per_page = int(args["per_page"]) if "per_page" in args else (50 if "page" in args else None)
+    if page < 1 or (per_page is not None and not 1 <= per_page <= DISPLAY_MAX_PER_PAGE):
+        raise ValueError(f"page must be >= 1 and per_page between 1 and {DISPLAY_MAX_PER_PAGE}")
+    return date_from, date_to, types, page, per_page
+
+@app.route('/display', methods=['GET', 'POST'])
+@DISPLAY_SECONDS.time()
+def display_data():
+    try:
+        cache = load_display_rows(display_file)
     except FileNotFoundError:
         return jsonify({"status": "error", "message": "CSV file not found"}), 500
-    except pd.errors.EmptyDataError:
+    except EOFError:
         return jsonify({"status": "error", "message": "CSV file is empty"}), 500
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+    try:
+        date_from, date_to, types, page, per_page = parse_display_filters(request.args)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": f"Invalid filter: {e}"}), 400
+
+    use_gzip = "gzip" in request.accept_encodings
+    compressed = False
+    if date_from is None and date_to is None and types is None and per_page is None:
+        # Unfiltered request: serve the cached body as is
+        body = cache["body"]
+        total = len(cache["rows"])
+        etag = cache["etag"]
+        if use_gzip and len(body) >= GZIP_MIN_BYTES:
+            if cache["gzip_body"] is None:
+                cache["gzip_body"] = gzip.compress(body)
+            body = cache["gzip_body"]
+            compressed = True
+    else:
+        selected = [
+            row for row, day in zip(cache["rows"], cache["days"])
+            if (types is None or str(row["type"]).lower() in types)
+            and (date_from is None or (day is not None and day >= date_from))
+            and (date_to is None or (day is not None and day <= date_to))
+        ]
+        total = len(selected)
+        if per_page is not None:
+            selected = selected[(page - 1) * per_page:page * per_page]
+        body = json.dumps(selected).encode()
+        etag = hashlib.sha1(cache["etag"].encode() + request.query_string).hexdigest()
+        if use_gzip and len(body) >= GZIP_MIN_BYTES:
+            body = gzip.compress(body)
+            compressed = True
+
+    response = app.response_class(body, status=200, mimetype='application/json')
+    if compressed:
+        response.headers["Content-Encoding"] = "gzip"
+        etag += "-gzip"
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["X-Total-Count"] = str(total)
+    response.headers["X-Schedule-Generation"] = str(cache["generation"])
+    response.set_etag(etag)
+    response.last_modified = cache["last_modified"]
+    # Answers 304 Not Modified when If-None-Match / If-Modified-Since still match
+    return response.make_conditional(request)
+
 @app.route('/schedule', methods=['GET', 'POST'])
 def handle_schedule():
     data = request.json
-    print('Schedule Data Received:', data)
+    logger.info('Schedule Data Received: %s', data)
 
     # Ensure the data is in the expected format (a single integer representing minutes)
     if isinstance(data, dict) and len(data) == 1 and isinstance(list(data.values())[0], int):
@@ -187,20 +436,98 @@ def handle_schedule():
         # Format the data to Seconds  (no need for complex date parsing)
         time_in_seconds = minutes * 60
 
-        # Use a background thread to handle the delay
-        import threading
-        threading.Thread(target=lambda: (time.sleep(time_in_seconds), relay_trigger())).start()
-
-        # Log the formatted data
-        # log_to_file('input.txt', formatted_data)
+        # The scheduler owns delayed bells, hand the delay to its control socket
+        try:
+            timer = control.submit(time_in_seconds, duration=5, source="schedule")
+        except OSError as e:
+            return jsonify({"status": "error", "message": f"Scheduler not reachable: {e}"}), 503
 
-        return jsonify({"status": "success", "message": "Schedule data received"}), 200
+        return jsonify({"status": "success", "message": "Schedule data received", "timer": timer}), 200
     else:
         return jsonify({"status": "error", "message": "Invalid data format for schedule"}), 400
 
+@app.route('/schedule/timers', methods=['GET'])
+def list_timers():
+    try:
+        return jsonify(control.list_timers()), 200
+    except OSError as e:
+        return jsonify({"status": "error", "message": f"Scheduler not reachable: {e}"}), 503
+
+@app.route('/schedule/timers/<timer_id>', methods=['DELETE'])
+def cancel_timer(timer_id):
+    try:
+        timer = control.cancel(timer_id)
+    except OSError as e:
+        return jsonify({"status": "error", "message": f"Scheduler not reachable: {e}"}), 503
+    if timer is None:
+        return jsonify({"status": "error", "message": "Unknown timer"}), 404
+    return jsonify({"status": "success", "message": "Timer cancelled", "timer": timer}), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """
+    Prometheus text format: this process's metrics plus whatever the scheduler
+    and the compiler last published to METRICS_DIR.
+    """
+    for path in STATE_FILES:
+        signature = file_signature(path)
+        STATE_FILE_BYTES.labels(file=path).set(signature[1] if signature else 0)
+    published = metrics.read_published()
+    now = time.time()
+    for name, (published_at, _) in published.items():
+        METRICS_AGE.labels(process=name).set(round(now - published_at, 3))
+    sources = [({"process": "app"}, metrics.REGISTRY.snapshot())]
+    sources += [({"process": name}, snapshot) for name, (_, snapshot) in published.items()]
+    return app.response_class(metrics.render(sources), status=200, mimetype='text/plain; version=0.0.4')
+
+# Profiling controls for this process, only answered on the Pi itself (curl -X POST http://127.0.0.1:5000/...)
+def local_only():
+    if request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({"status": "error", "message": "Only available from localhost"}), 403
+    return None
+
+@app.route('/admin/profile', methods=['GET'])
+def profile_status():
+    return local_only() or (jsonify(profiling.profile_status()), 200)
+
+@app.route('/admin/profile/start', methods=['POST'])
+def profile_start():
+    denied = local_only()
+    if denied:
+        return denied
+    seconds = request.args.get('seconds', type=float)  # Stop and write the stacks by itself after this long
+    if not profiling.start_profile(seconds):
+        return jsonify({"status": "error", "message": "Profiler already running"}), 409
+    return jsonify({"status": "success", "message": "Profiler started"}), 200
+
+@app.route('/admin/profile/stop', methods=['POST'])
+def profile_stop():
+    denied = local_only()
+    if denied:
+        return denied
+    path = profiling.stop_profile()
+    if path is None:
+        return jsonify({"status": "error", "message": "Profiler not running"}), 409
+    return jsonify({"status": "success", "path": path}), 200
+
+@app.route('/admin/profile/memory', methods=['POST'])
+def profile_memory():
+    denied = local_only()
+    if denied:
+        return denied
+    path = profiling.memory_snapshot()
+    if path is None:
+        return jsonify({"status": "success", "message": "tracemalloc started, ask again for a report"}), 200
+    return jsonify({"status": "success", "path": path}), 200
+
 @app.route('/', methods=['GET', 'POST'])
 def display_msg():
     return jsonify({"message": "Server is running..."}), 200
 
 if __name__ == '__main__':
+    setup_logging("app")
+    profiling.install("app")
+    if "--startup-report" in sys.argv:
+        import startup_report
+        startup_report.report_ready("app")
     app.run(host='0.0.0.0', port=5000, debug=True, ssl_context=("selfsigned.pem", "selfsigned.pem"))
@@ -1,37 +1,64 @@
 #!/usr/bin/env python3
-import RPi.GPIO as GPIO
+import logging
 import time
 from datetime import datetime, timedelta
 import os
-
-relay_pin = 4
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(relay_pin, GPIO.OUT)
-
-# Function to simulate ringing the bell
-def ring_bell(duration):
-    GPIO.output(relay_pin, GPIO.HIGH)
-    print(f"Bell ringing for {duration} seconds", flush=True)
-    time.sleep(duration)
-    print("Bell stopped", flush=True)
-    GPIO.output(relay_pin, GPIO.LOW)
-
-saturday_timings = [
-    "08:55:00", "09:00:00", "09:55:00", "10:00:00", "10:55:00", "11:00:00",
-    "11:55:00", "12:00:00", "12:55:00"
-]
-weekday_timings = [
-    "08:55:00", "09:00:00", "09:55:00", "10:00:00", "10:55:00", "11:00:00",
-    "11:55:00", "12:00:00", "12:55:00", "13:00:00", "13:55:00", "14:00:00",
-    "14:55:00", "15:00:00", "15:55:00"
-]
-weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+import sys
+from schedule_intervals import ScheduleCalendar
+from normalize import parse_date
+from bell_timetable import REASON_NAMES
+from fire_table import FireTable, pack_fire_table
+from snapshot import read_generation
+import relay
+import hardware
+import control
+from timer_service import TimerService
+from schedule_store import open_store
+from log_config import setup_logging
+import metrics
+import profiling
+
+final_file = "/home/pi/Desktop/server/final.txt"
+manifest_file = "/home/pi/Desktop/server/snapshot.json"
+fire_table_file = "/home/pi/Desktop/server/fire_table.bin"  # Packed bells written by processing.py
+timers_file = "/home/pi/Desktop/server/timers.json"  # Delayed bells submitted by the API and the keypad
+CHANGE_CHECK_INTERVAL = 2  # Seconds between generation checks while waiting for the next bell
+CATCH_UP_WINDOW = int(os.environ.get("BELL_CATCH_UP_SECONDS", "60"))  # Late bells within this many seconds still ring
+CLOCK_STEP_TOLERANCE = 2  # Wall-clock jumps bigger than this (seconds) are treated as a clock step
+clock = hardware.CLOCK  # replay.py swaps in a VirtualClock
+relay_client = relay  # ...and a SimRelay that records the rings
+control_plane = None  # Set once the control socket is served, pushes every ring to subscribers
+logger = logging.getLogger("scheduler")
+
+FIRE_LATENCY = metrics.histogram("bell_fire_latency_seconds", "How long after its scheduled time each bell was rung")
+LOOP_JITTER = metrics.histogram("bell_loop_wakeup_jitter_seconds", "How late the scheduler loop woke up after the time it asked for")
+BELLS_RUNG = metrics.counter("bell_rung_total", "Scheduled bells rung, by reason (regular, midsem, endsem)")
+BELLS_MISSED = metrics.counter("bell_missed_total", "Scheduled bells given up on because they were later than the catch-up window, by reason")
+CLOCK_STEPS = metrics.counter("bell_clock_steps_total", "Wall-clock steps noticed by the scheduler")
+SCHEDULE_LOAD = metrics.histogram("bell_schedule_load_seconds", "Time to load a day's bells, from the fire table or final.txt")
+PROCESS_EVENTS = metrics.histogram("bell_process_latest_events_seconds", "Time to parse final.txt when the fire table cannot be used")
+
+# Function to ring the bell, the relay daemon owns the pin so this returns immediately
+def ring_bell(duration, source="scheduler"):
+    logger.info(f"Bell ringing for {duration} seconds ({source})")
+    try:
+        relay_client.ring_bell(duration, source=source)
+    except OSError as e:
+        # Either the daemon is down (the ring was dropped and counted) or it did not answer in time
+        logger.error(f"Relay daemon did not confirm the {source} bell: {e}")
+        return
+    if control_plane:
+        control_plane.publish("rung", duration=duration, source=source)
+
+# Called by the timer service when a delayed bell from the API or the keypad is due
+def ring_timer(timer):
+    ring_bell(timer["duration"], source=timer["source"] or "schedule")
 
 # Function to process the latest events file
+@PROCESS_EVENTS.time()
 def process_latest_events(input_file):
-    date_events = {}
+    calendar = ScheduleCalendar()
     immediate_ring = False
-    specific_time_event = None
 
     with open(input_file, 'r') as infile:
         for line in infile:
@@ -41,119 +68,174 @@ def process_latest_events(input_file):
                 event_type = int(parts[0])
 
                 if event_type == 0:
-                    if len(parts) == 2:
-                        # Single-day holiday
-                        date_str = parts[1]
-                        date_events[date_str] = {'event': (event_type, None, None)}
-                    elif len(parts) == 3:
-                        # Range-based holiday
+                    if len(parts) in (2, 3):
+                        # Single-day or range-based holiday, kept as one interval
                         try:
-                            start_date = datetime.strptime(parts[1], "%d-%m-%Y")
-                            end_date = datetime.strptime(parts[2], "%d-%m-%Y")
-                            current = start_date
-                            while current <= end_date:
-                                date_str = current.strftime("%d-%m-%Y")
-                                date_events[date_str] = {'event': (event_type, None, None)}
-                                current += timedelta(days=1)
+                            start_date = parse_date(parts[1])
+                            end_date = parse_date(parts[2]) if len(parts) == 3 else start_date
+                            calendar.add_holiday(start_date, end_date)
                         except ValueError as ve:
-                            print(f"Invalid date format in line: {line} -> {ve}")
+                            logger.warning(f"Invalid date format in line: {line} -> {ve}")
                     else:
-                        print(f"Invalid holiday line format: {line}")
+                        logger.warning(f"Invalid holiday line format: {line}")
                 elif event_type in (1, 2):  # MID SEM or END SEM
                     slot = int(parts[1])
-                    date_str = parts[2]
-                    event_time = parts[3] if len(parts) > 3 else None
-                    print(f"Detected event: Type {event_type}, Slot {slot}, Date {date_str}, Time {event_time}")
-
-                    if date_str not in date_events or date_events[date_str].get('event', (None,))[0] != 0:
-                        if date_str not in date_events:
-                            date_events[date_str] = {}
-                        date_events[date_str][slot] = (event_type, event_time)
+                    start_date = parse_date(parts[2])
+                    if len(parts) > 4:
+                        # Range of days with the same slot time
+                        end_date = parse_date(parts[3])
+                        event_time = parts[4] or None  # final.txt leaves the field empty for exams without a time
+                    else:
+                        end_date = start_date
+                        event_time = (parts[3] or None) if len(parts) > 3 else None
+                    logger.debug(f"Detected event: Type {event_type}, Slot {slot}, Date {parts[2]}, Time {event_time}")
+
+                    # Holidays mask exam slots inside the calendar
+                    calendar.add_exam(slot, start_date, end_date, event_type, event_time)
                 elif event_type == 3:
-                    specific_time_event = parts[1]
                     immediate_ring = True
 
-    return date_events, immediate_ring, specific_time_event
-
-# Offsets for MID SEM and END SEM
-midsem_offsets = {
-    1: [timedelta(minutes=0), timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=2, minutes=5), timedelta(hours=2, minutes=15)],
-    2: [timedelta(minutes=0), timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=2, minutes=5), timedelta(hours=2, minutes=15)],
-    3: [timedelta(minutes=0), timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=2, minutes=5), timedelta(hours=2, minutes=15)]
-}
-
-endsem_offsets = {
-    1: [timedelta(minutes=0), timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=3, minutes=5), timedelta(hours=3, minutes=15)],
-    2: [timedelta(minutes=0), timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=3, minutes=5), timedelta(hours=3, minutes=15)],
-    3: [timedelta(minutes=0), timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=3, minutes=5), timedelta(hours=3, minutes=15)]
-}
-
-# Function to calculate bell times
-def calculate_bell_times(base_time_str, offsets):
-    base_time = datetime.strptime(base_time_str, "%H:%M:%S")
-    return [(base_time + offset).strftime("%H:%M:%S") for offset in offsets]
-
-# Main loop
-def main_loop():
-    print("Starting the main loop...")
-
+    return calendar, immediate_ring
+
+@SCHEDULE_LOAD.time()
+def load_fire_table(store, day):
+    """
+    Returns the bells around day as a FireTable. Normally this is the compiler's
+    memory-mapped fire_table.bin; if it is missing, stale or damaged, the day is
+    compiled here from the store or final.txt instead.
+    Returns (table, immediate_ring).
+    """
+    day_start = datetime.combine(day, datetime.min.time()).timestamp()
+    try:
+        table = FireTable.open(fire_table_file)
+        if table.covers(day_start, day_start + 86400):
+            return table, False
+        table.close()
+        logger.warning(f"{fire_table_file} does not cover {day.strftime('%d-%m-%Y')}, reading the schedule instead")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Cannot use {fire_table_file} ({e}), reading the schedule instead")
+
+    if store:
+        calendar, immediate_ring = store.calendar_for(day), False
+    else:
+        calendar, immediate_ring = process_latest_events(final_file)
+    return FireTable(pack_fire_table(calendar, day, 1)), immediate_ring
+
+def sleep_until(wake_at, max_sleep):
+    """
+    Sleeps until the wall-clock epoch wake_at (at most max_sleep seconds), waking on a second boundary.
+    The wait itself runs on the monotonic clock, so a wall-clock step cannot stretch or shorten it.
+    Returns how many seconds the wall clock was stepped while we slept (0 if it was not).
+    """
+    wall_before = clock.time()
+    mono_before = clock.monotonic()
+    delay = min(wake_at - wall_before, max_sleep - wall_before % 1)
+    deadline = mono_before + max(0, delay)
     while True:
-        now = datetime.now()
-        current_time_str = now.strftime("%H:%M:%S")
-        current_date = now.strftime("%d-%m-%Y")
-        current_weekday = now.strftime("%A")
-
-        print(f"Checking events at {current_time_str} on {current_date} ({current_weekday})")
-
-        date_events, immediate_ring, specific_time_event = process_latest_events("/home/pi/Desktop/server/final.txt")
-
-        
-        if immediate_ring:
-            print(f"Immediate bell ring triggered at {current_time_str}")
-            ring_bell(3)
-
-        is_special_day = current_date in date_events and any(
-            isinstance(slot_data, tuple) and slot_data[0] in (1, 2)
-            for slot_data in date_events[current_date].values()
-        )
-        print(f"specialday value ={is_special_day}")
-        if current_date in date_events and 'event' in date_events[current_date] and date_events[current_date]['event'][0] == 0:
-            print(f"Today ({current_date}) is a holiday. No bells will ring.")
-        if not is_special_day:
-            if current_weekday == "Sunday":
-                time.sleep(60)
-                continue
+        remaining = deadline - clock.monotonic()
+        if remaining <= 0:
+            break
+        clock.sleep(remaining)
+    LOOP_JITTER.observe(clock.monotonic() - deadline)
 
-            if current_weekday == "Saturday" and current_time_str in saturday_timings:
-                ring_bell(3)
+    step = (clock.time() - wall_before) - (clock.monotonic() - mono_before)
+    return step if abs(step) > CLOCK_STEP_TOLERANCE else 0
 
-            if current_weekday in weekdays and current_time_str in weekday_timings:
+# Main loop
+def main_loop(on_ready=None, until=None):
+    """
+    Walks a cursor through the sorted fire table and sleeps until the next bell is due.
+    The table is only re-opened when the snapshot generation changes or the date rolls over;
+    finding the next bell is a binary search, no text is parsed on the way.
+    Bells that are late by at most CATCH_UP_WINDOW seconds still ring, and a bell never rings twice.
+    on_ready() is called once, after the first schedule has been loaded.
+    With until (an epoch) the loop returns once the clock passes it, otherwise it runs forever.
+    """
+    logger.info("Starting the main loop...")
+    store = open_store()  # With BELL_DB set, the fallback reads today's ranges from the shared database
+    loaded_signature = None
+    loaded_day = None
+    table = None
+    cursor = 0
+    fired = set()  # Fire epochs that already rang (or were given up on), survives reloads
+    checked_until = None  # Wall-clock time the table has been walked up to
+    resume_from = None  # Set after a forward clock step, so the bells it jumped over are walked too
+
+    while until is None or clock.time() < until:
+        now = clock.time()
+        today = datetime.fromtimestamp(now).date()
+        # The compiler bumps the snapshot generation after every atomic write, no need to stat or parse final.txt
+        signature = store.compiled_generation() if store else read_generation(manifest_file)
+        if signature != loaded_signature or today != loaded_day:
+            if table:
+                table.close()
+            try:
+                table, immediate_ring = load_fire_table(store, today)
+            except Exception as e:
+                logger.error(f"Error reading the schedule: {e}")
+                table, immediate_ring = FireTable(pack_fire_table(ScheduleCalendar(), today, 1)), False
+            if immediate_ring:
+                logger.info(f"Immediate bell ring triggered at {time.strftime('%H:%M:%S', time.localtime(now))}")
                 ring_bell(3)
 
-        if current_date in date_events and ('event' not in date_events[current_date] or date_events[current_date]['event'][0] != 0):
-            
-        
-            for slot, (event_type, event_time) in date_events[current_date].items():
-                if event_time:
-                    if event_type == 1:
-                        offsets = midsem_offsets
-                    elif event_type == 2:
-                        offsets = endsem_offsets
-                        
-                    elif event_type == 0:
-                        time.sleep(1)
-                    else:
-                        continue  # Ignore unknown event types
-
-                    print(f"Processing Slot: {slot}, Base Time: {event_time}")
-                    result_times = calculate_bell_times(event_time, offsets.get(slot, []))
-                    print(f"Computed Bell Times: {result_times}")
-
-                    if current_time_str in result_times:
-                        ring_bell(3)
-
-        time.sleep(1)
+            # Start from the catch-up window so late bells still ring after a reload or clock step.
+            # After a forward step start where we left off instead: the bells the step skipped
+            # are then reported (and counted) as missed rather than silently passed over.
+            oldest = now - CATCH_UP_WINDOW
+            if resume_from is not None:
+                oldest = min(oldest, resume_from)
+                resume_from = None
+            fired = {fire_epoch for fire_epoch in fired if fire_epoch >= oldest - 86400}
+            cursor = table.bisect(oldest)
+            midnight = datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp()
+            loaded_signature, loaded_day = signature, today
+            logger.info(f"Loaded {table.bisect(midnight) - cursor} upcoming bells for {today.strftime('%d-%m-%Y')} ({today.strftime('%A')})")
+            if on_ready:
+                on_ready()
+                on_ready = None
+
+        while cursor < len(table):
+            fire_epoch, duration, zone, reason = table[cursor]
+            if fire_epoch > clock.time():
+                break
+            cursor += 1
+            if fire_epoch in fired:
+                continue
+            fired.add(fire_epoch)
+            label = f"slot {zone}" if zone else REASON_NAMES.get(reason, "regular")
+            fire_str = time.strftime('%H:%M:%S', time.localtime(fire_epoch))
+            lateness = clock.time() - fire_epoch
+            if lateness > CATCH_UP_WINDOW:
+                logger.warning(f"Missed {label} bell for {fire_str} ({lateness:.0f}s late)")
+                BELLS_MISSED.labels(reason=REASON_NAMES.get(reason, "regular")).inc()
+                continue
+            logger.info(f"Ringing {label} bell for {fire_str} ({lateness:.1f}s late)")
+            ring_bell(duration)
+            FIRE_LATENCY.observe(lateness)
+            BELLS_RUNG.labels(reason=REASON_NAMES.get(reason, "regular")).inc()
+
+        checked_until = clock.time()
+        # Sleep until the next bell, but wake up regularly to notice schedule changes and midnight
+        wake_at = min(table[cursor][0] if cursor < len(table) else midnight, midnight)
+        logger.debug("Next bell check at %.0f, %d bells left in the table", wake_at, len(table) - cursor)
+        step = sleep_until(wake_at, CHANGE_CHECK_INTERVAL)
+        if step:
+            # e.g. NTP fixing the clock after boot: re-seek the table against the new time
+            logger.warning(f"Wall clock stepped by {step:+.1f}s, re-seeking the bell table")
+            CLOCK_STEPS.inc()
+            loaded_signature = None
+            if step > 0:
+                resume_from = checked_until
 
 # Run the main loop
-main_loop()
- 
+if __name__ == "__main__":
+    setup_logging("scheduler")
+    metrics.start_publisher("scheduler")
+    profiling.install("scheduler")
+    # Delayed bells live here too, so the API and the keypad submit them over the control socket
+    control_plane = control.serve(TimerService(timers_file, ring_timer, catch_up_window=CATCH_UP_WINDOW))
+    on_ready = None
+    if "--startup-report" in sys.argv:
+        import startup_report
+        on_ready = lambda: startup_report.report_ready("scheduler")
+    main_loop(on_ready)
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+from datetime import timedelta
+
+# Regular bells, rung on days without exams
+saturday_timings = [
+    "08:55:00", "09:00:00", "09:55:00", "10:00:00", "10:55:00", "11:00:00",
+    "11:55:00", "12:00:00", "12:55:00"
+]
+weekday_timings = [
+    "08:55:00", "09:00:00", "09:55:00", "10:00:00", "10:55:00", "11:00:00",
+    "11:55:00", "12:00:00", "12:55:00", "13:00:00", "13:55:00", "14:00:00",
+    "14:55:00", "15:00:00", "15:55:00"
+]
+weekdays = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+
+BELL_DURATION = 3  # Seconds each scheduled bell rings
+
+# Reason codes stored with every bell, regular bells have zone (slot) 0
+REASON_REGULAR = 0
+REASON_MIDSEM = 1
+REASON_ENDSEM = 2
+REASON_NAMES = {REASON_REGULAR: "regular", REASON_MIDSEM: "midsem", REASON_ENDSEM: "endsem"}
+
+# Exam bell offsets from the slot's start time, one profile per exam type and shared by
+# every slot. The compiler's CSV and the scheduler both read these, via timeline.py.
+EXAM_OFFSETS = {
+    REASON_MIDSEM: [timedelta(minutes=0), timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=2, minutes=5), timedelta(hours=2, minutes=15)],
+    REASON_ENDSEM: [timedelta(minutes=0), timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=3, minutes=5), timedelta(hours=3, minutes=15)],
+}
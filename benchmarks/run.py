@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Times the compiler, scheduler and API hot paths on synthetic calendars: the paths the
+daemons run (incremental update_events, render_*, write_snapshot, pack_fire_table and
+fire table lookups) and the older full-file functions, kept for comparison.
+
+    python3 benchmarks/run.py                          # 10k and 100k lines, 5 runs each
+    python3 benchmarks/run.py --lines 1000000 --repeat 3
+    python3 benchmarks/run.py --record                 # append the results to benchmarks/results.jsonl
+    python3 benchmarks/run.py --compare                # exit 1 if slower than the last recorded run
+
+Runs on any Linux box: the Pi's GPIO, board and digitalio modules are replaced by stubs.
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_FILE = os.path.join(BENCH_DIR, "results.jsonl")
+DEFAULT_LINES = [10000, 100000]
+DEFAULT_REPEAT = 5
+REGRESSION_THRESHOLD = 0.25  # A median this much slower than the last recorded one is a regression
+REGRESSION_MIN_SECONDS = 0.002  # ...and at least this much slower, sub-millisecond timings are mostly noise
+APPEND_LINES = 50  # Lines added to input.txt before each incremental update_events run
+
+class _Stub(types.ModuleType):
+    """
+    Module whose every attribute is a callable no-op, so GPIO.setup(...), board.D26 and
+    digitalio.DigitalInOut(pin).direction = ... all work without the hardware.
+    """
+    def __getattr__(self, name):
+        return _Stub(f"{self.__name__}.{name}")
+
+    def __call__(self, *args, **kwargs):
+        return _Stub(self.__name__)
+
+def stub_hardware():
+    for name in ("RPi", "RPi.GPIO", "board", "digitalio", "adafruit_character_lcd",
+                 "adafruit_character_lcd.character_lcd"):
+        sys.modules.setdefault(name, _Stub(name))
+    sys.modules["RPi"].GPIO = sys.modules["RPi.GPIO"]
+
+def measure(function, repeat):
+    """
+    Runs function repeat times. Returns (best, median) in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings), statistics.median(timings)
+
+def run(lines, repeat, workdir):
+    """
+    Generates a workload of the given size in workdir and times every hot path on it.
+    Returns {benchmark name: (best, median)}.
+    """
+    import workloads
+    os.chdir(workdir)  # app.py keeps its files relative to the working directory
+    import app
+    import bell
+    import processing
+    from datetime import datetime, timedelta
+    from fire_table import FIRE_TABLE_DAYS, FireTable, pack_fire_table
+    from snapshot import write_snapshot
+
+    input_file = os.path.join(workdir, f"input-{lines}.txt")
+    final_file = os.path.join(workdir, f"final-{lines}.txt")
+    workloads.write_lines(input_file, workloads.input_lines(lines))
+    workloads.write_lines(final_file, workloads.final_lines(lines))
+    payloads = list(workloads.display_payloads(lines))
+    calendar = processing.read_and_process_events(input_file)
+
+    csv_file = os.path.join(workdir, "bell_events.csv")
+    processing.write_to_csv(calendar, csv_file)
+    app.display_file = csv_file
+    app.manifest_file = os.path.join(workdir, "snapshot.json")
+    client = app.app.test_client()
+
+    def display_cold():
+        app.display_cache["signature"] = None
+        client.get('/display')
+
+    # What the compiler daemon runs: incremental replay of input.txt, rendering, snapshot and fire table
+    checkpoint_file = os.path.join(workdir, "compile_state.pkl")
+    log_file = os.path.join(workdir, f"input-log-{lines}.txt")
+    workloads.write_lines(log_file, workloads.input_lines(lines))
+    appended = list(workloads.input_lines(APPEND_LINES, seed=2))
+
+    def update_events_cold():
+        processing.checkpoint = None  # As after a restart with no usable checkpoint
+        if os.path.exists(checkpoint_file):
+            os.remove(checkpoint_file)
+        processing.update_events(log_file, checkpoint_file)
+
+    def update_events_append():
+        workloads.write_lines(log_file, appended, mode='a')
+        processing.update_events(log_file, checkpoint_file)
+
+    first_day = workloads.TERM_START
+    snapshots = itertools.count()
+    outputs = {
+        os.path.join(workdir, "final.snap"): processing.render_latest_events(calendar),
+        os.path.join(workdir, "csv.snap"): processing.render_csv(calendar),
+        os.path.join(workdir, "fire_table.snap"): pack_fire_table(calendar, first_day),
+    }
+
+    def write_snapshot_changed():
+        # A new manifest each time, so every output is hashed and written
+        write_snapshot(os.path.join(workdir, f"snapshot-{next(snapshots)}.json"), outputs)
+
+    # What the scheduler runs: map the table, seek to the day and read its bells
+    table_file = os.path.join(workdir, "fire_table.snap")
+    day_starts = [datetime.combine(first_day + timedelta(days=day), datetime.min.time()).timestamp()
+                  for day in range(FIRE_TABLE_DAYS)]
+
+    def fire_table_lookup():
+        table = FireTable.open(table_file)
+        for day_start in day_starts:
+            index = table.bisect(day_start)
+            while index < len(table) and table[index][0] < day_start + 86400:
+                index += 1
+        table.close()
+
+    benchmarks = {
+        "update_events_cold": update_events_cold,
+        "update_events_append": update_events_append,
+        "render_latest_events": lambda: processing.render_latest_events(calendar),
+        "render_csv": lambda: processing.render_csv(calendar),
+        "pack_fire_table": lambda: pack_fire_table(calendar, first_day),
+        "write_snapshot": write_snapshot_changed,
+        "write_snapshot_unchanged": lambda: write_snapshot(os.path.join(workdir, "snapshot.json"), outputs),
+        "fire_table_lookup": fire_table_lookup,
+        # Kept for comparison with older records; the daemons only use these in one-off tools and fallbacks
+        "read_and_process_events": lambda: processing.read_and_process_events(input_file),
+        "write_latest_events": lambda: processing.write_latest_events(calendar, os.path.join(workdir, "final.out")),
+        "write_to_csv": lambda: processing.write_to_csv(calendar, os.path.join(workdir, "csv.out")),
+        "process_latest_events": lambda: bell.process_latest_events(final_file),
+        "format_data": lambda: [app.format_data(payload) for payload in payloads],
+        "display_cold": display_cold,
+        "display_cached": lambda: client.get('/display'),
+        "display_filtered": lambda: client.get('/display?type=midsem&page=2&per_page=100'),
+    }
+    return {name: measure(function, repeat) for name, function in benchmarks.items()}
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def last_recorded(host):
+    """
+    Returns {(benchmark, lines): median} from the newest recorded run on this host.
+    """
+    latest = {}
+    try:
+        with open(RESULTS_FILE) as file:
+            for line in file:
+                result = json.loads(line)
+                if result["host"] == host:
+                    latest[(result["benchmark"], result["lines"])] = result["median"]
+    except FileNotFoundError:
+        pass
+    return latest
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the bell server on synthetic calendars")
+    parser.add_argument("--lines", default=",".join(map(str, DEFAULT_LINES)),
+                        help="comma separated workload sizes in input.txt lines")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--record", action="store_true", help=f"append the results to {RESULTS_FILE}")
+    parser.add_argument("--compare", action="store_true", help="exit 1 on a regression against the last record")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    stub_hardware()
+    sys.path[:0] = [REPO_DIR, BENCH_DIR]
+    logging.basicConfig(level=logging.ERROR)
+    host = platform.node()
+    previous = last_recorded(host) if args.compare else {}
+    commit = git_commit()
+    results = []
+    regressions = []
+
+    print(f"{'benchmark':<26}{'lines':>9}{'best':>11}{'median':>11}  vs last")
+    with tempfile.TemporaryDirectory(prefix="bell-bench-") as workdir:
+        for lines in [int(value) for value in args.lines.split(",")]:
+            for name, (best, median) in run(lines, args.repeat, workdir).items():
+                before = previous.get((name, lines))
+                change = ""
+                if before:
+                    change = f"{(median / before - 1) * 100:+.0f}%"
+                    if median > before * (1 + args.threshold) and median - before >= REGRESSION_MIN_SECONDS:
+                        change += "  << regression"
+                        regressions.append(name)
+                print(f"{name:<26}{lines:>9}{best * 1000:>9.1f}ms{median * 1000:>9.1f}ms  {change}")
+                results.append({"time": time.strftime('%Y-%m-%dT%H:%M:%S'), "host": host, "commit": commit,
+                                "python": platform.python_version(), "benchmark": name, "lines": lines,
+                                "repeat": args.repeat, "best": best, "median": median})
+
+    if args.record:
+        with open(RESULTS_FILE, 'a') as file:
+            for result in results:
+                file.write(json.dumps(result) + '\n')
+    if regressions:
+        print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(sorted(set(regressions)))}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+import random
+from datetime import date, timedelta
+
+TERM_START = date(2025, 1, 6)
+SLOTS = 6  # Exam slots per day, more than a real timetable uses
+SLOT_TIMES = ["08:00:00", "09:15:00", "10:30:00", "12:00:00", "13:15:00", "15:30:00"]
+
+def _day(value):
+    return value.strftime('%d-%m-%Y')
+
+HOLIDAY_LINES_PER_YEAR = 20  # About a third of the days end up holidays, however many lines there are
+
+def input_lines(count, years=3, seed=1):
+    """
+    Yields count synthetic input.txt lines spread over years: holidays (a few of them ranges
+    of one to four months, plus one of two years right after the span), the rest exam lines
+    on dense slots. Holidays are kept to about a third of the days at any size, otherwise
+    they would cover every day and leave no exam bells to compile.
+    The same seed always gives the same lines.
+    """
+    rng = random.Random(seed)
+    span = years * 365
+    holiday_share = min(0.2, HOLIDAY_LINES_PER_YEAR * years / count)
+    for index in range(count):
+        start = TERM_START + timedelta(days=rng.randrange(span))
+        kind = rng.random()
+        if index == 0:
+            after = TERM_START + timedelta(days=span)
+            yield f"0,{_day(after)},{_day(after + timedelta(days=730))}"
+        elif kind < holiday_share * 0.05:
+            yield f"0,{_day(start)},{_day(start + timedelta(days=rng.randrange(30, 120)))}"
+        elif kind < holiday_share:
+            length = rng.choice((0, 0, 0, 1, 2, 6, 13))
+            if length:
+                yield f"0,{_day(start)},{_day(start + timedelta(days=length))}"
+            else:
+                yield f"0,{_day(start)}"
+        else:
+            event_type = rng.choice((1, 2))
+            slot = rng.randrange(1, SLOTS + 1)
+            length = rng.choice((0, 0, 4, 9))
+            if length:
+                yield f"{event_type},{slot},{_day(start)},{_day(start + timedelta(days=length))},{SLOT_TIMES[slot - 1]}"
+            else:
+                yield f"{event_type},{slot},{_day(start)},{SLOT_TIMES[slot - 1]}"
+
+def final_lines(count, seed=1):
+    """
+    Yields count final.txt lines in the one-line-per-day form the scheduler still accepts,
+    as large as such a file gets when nothing was merged into ranges.
+    """
+    rng = random.Random(seed)
+    day = TERM_START
+    for _ in range(count):
+        if rng.random() < 0.2:
+            yield f"0,{_day(day)}"
+        else:
+            slot = rng.randrange(1, SLOTS + 1)
+            yield f"{rng.choice((1, 2))},{slot},{_day(day)},{SLOT_TIMES[slot - 1]}"
+        if rng.random() < 1 / SLOTS:
+            day += timedelta(days=1)
+
+def display_payloads(count, seed=1):
+    """
+    Yields count request bodies as the front end posts them, for format_data.
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        start = TERM_START + timedelta(days=rng.randrange(365))
+        end = start + timedelta(days=rng.randrange(10))
+        mode = rng.choice(('0', '0r', '1', '2'))
+        if mode == '0':
+            yield {"mode": '0', "date": start.strftime('%d/%m/%Y')}
+        elif mode == '0r':
+            yield {"mode": '0', "startDate": start.strftime('%d/%m/%Y'), "endDate": end.strftime('%d/%m/%Y')}
+        elif mode == '1':
+            yield {"mode": '1', "slot": str(rng.randrange(1, SLOTS + 1)), "start date": start.strftime('%d/%m/%Y'),
+                   "end date": end.strftime('%d/%m/%Y'), "start_time": rng.choice(SLOT_TIMES)}
+        else:
+            days = [(start + timedelta(days=i)).strftime('%d/%m/%y') for i in range(rng.randrange(1, 5))]
+            yield {"mode": '2', "slot": str(rng.randrange(1, SLOTS + 1)), "date": days,
+                   "start_time": rng.choice(SLOT_TIMES)}
+
+def write_lines(path, lines, mode='w'):
+    with open(path, mode) as file:
+        for line in lines:
+            file.write(line + '\n')
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+import logging
+import os
+import queue
+import threading
+import time
+import ipc
+
+SOCKET_PATH = os.environ.get("BELL_CONTROL_SOCKET", "/tmp/cu-bell-control.sock")
+KEEPALIVE_SECONDS = 30  # Subscribers get a keepalive this often, so dead connections are noticed
+SUBSCRIBER_BACKLOG = 100  # Events queued for a slow subscriber before newer ones are dropped
+logger = logging.getLogger("control")
+
+class ControlPlane:
+    """
+    The scheduler's local API for delayed bells, served on a Unix socket. The API and the
+    keypad submit, list and cancel timers here, so every bell is decided in the scheduler
+    process. Subscribers are pushed each change ("added", "cancelled", "rung") as it happens.
+    """
+    def __init__(self, timer_service):
+        self.timers = timer_service
+        self.lock = threading.Lock()
+        self.subscribers = set()
+
+    def publish(self, event, **fields):
+        message = {"event": event, "at": time.time(), **fields}
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait(message)
+            except queue.Full:
+                pass  # A stalled subscriber misses events rather than holding up the scheduler
+
+    def _subscription(self):
+        events = queue.Queue(SUBSCRIBER_BACKLOG)
+        with self.lock:
+            self.subscribers.add(events)
+        try:
+            yield {"status": "subscribed"}
+            while True:
+                try:
+                    yield events.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield {"event": "keepalive", "at": time.time()}
+        finally:
+            with self.lock:
+                self.subscribers.discard(events)
+
+    def handle_message(self, message):
+        op = message.get("op")
+        if op == "submit":
+            timer = self.timers.add(float(message["delay"]), duration=message.get("duration", 5),
+                                    source=message.get("source", ""))
+            self.publish("added", timer=timer)
+            return {"status": "success", "timer": timer}
+        if op == "list":
+            return {"status": "success", "timers": self.timers.list()}
+        if op == "cancel":
+            timer = self.timers.cancel(message.get("id"))
+            if timer is None:
+                return {"status": "error", "message": "Unknown timer"}
+            self.publish("cancelled", timer=timer)
+            return {"status": "success", "timer": timer}
+        if op == "subscribe":
+            return self._subscription()
+        return {"status": "error", "message": f"Unknown op {op}"}
+
+def serve(timer_service):
+    """
+    Starts the timer service and serves the control socket from background threads.
+    Returns the ControlPlane, whose publish() the scheduler uses for its own bells.
+    """
+    plane = ControlPlane(timer_service)
+    timer_service.start()
+    ipc.serve(SOCKET_PATH, plane.handle_message)
+    logger.info(f"Control plane listening on {SOCKET_PATH}")
+    return plane
+
+# === Client side, used by the API and the keypad ===
+def _request(message):
+    reply = ipc.request(SOCKET_PATH, message)
+    if reply.get("status") == "error":
+        raise LookupError(reply.get("message"))
+    return reply
+
+def submit(delay_seconds, duration=5, source=""):
+    """
+    Asks the scheduler to ring the bell after delay_seconds. Returns the timer.
+    Raises OSError if the scheduler is not running.
+    """
+    return _request({"op": "submit", "delay": delay_seconds, "duration": duration, "source": source})["timer"]
+
+def list_timers():
+    return _request({"op": "list"})["timers"]
+
+def cancel(timer_id):
+    """
+    Cancels a pending timer and returns it, or None if there is no such timer.
+    """
+    try:
+        return _request({"op": "cancel", "id": timer_id})["timer"]
+    except LookupError:
+        return None
+
+def subscribe():
+    """
+    Yields the scheduler's events as they happen, without keepalives.
+    Raises OSError when the scheduler is not running or goes away.
+    """
+    for event in ipc.stream(SOCKET_PATH, {"op": "subscribe"}):
+        if event.get("event") not in (None, "keepalive"):
+            yield event
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+import itertools
+import threading
+import time
+
+class Compositor:
+    """
+    The only writer to the LCD. Threads post text to named layers with show(); one compositor
+    thread draws the highest-priority layer into a framebuffer and sends the LCD only the
+    cells that differ from what it already shows, each run of them with one cursor-positioned
+    write. A layer shown with a timeout disappears by itself, uncovering the one below.
+    """
+    def __init__(self, lcd, columns, rows):
+        self.lcd = lcd
+        self.columns = columns
+        self.rows = rows
+        self.layers = {}  # name -> (priority, order posted, lines, monotonic expiry or None)
+        self.order = itertools.count()
+        self.changed = threading.Condition()
+        self.dirty = False
+        self.cells_written = 0  # Characters sent to the LCD, for comparing with full redraws
+        self.lcd.clear()
+        self.shown = [" " * columns for _ in range(rows)]
+        threading.Thread(target=self._run, name="lcd", daemon=True).start()
+
+    def show(self, name, text, priority=0, timeout=None):
+        """
+        Sets the text of a layer. Higher priorities cover lower ones; with timeout (seconds)
+        the layer is removed again after that long.
+        """
+        lines = [line[:self.columns].ljust(self.columns) for line in text.split("\n")[:self.rows]]
+        lines += [" " * self.columns] * (self.rows - len(lines))
+        expires = time.monotonic() + timeout if timeout is not None else None
+        with self.changed:
+            self.layers[name] = (priority, next(self.order), lines, expires)
+            self.dirty = True
+            self.changed.notify()
+
+    def hide(self, name):
+        with self.changed:
+            if self.layers.pop(name, None) is not None:
+                self.dirty = True
+                self.changed.notify()
+
+    def clear(self):
+        with self.changed:
+            self.layers.clear()
+            self.dirty = True
+            self.changed.notify()
+
+    def _wait_for_change(self):
+        """
+        Blocks until a layer was changed or has expired. Returns the frame to draw.
+        Called with self.changed held.
+        """
+        while True:
+            now = time.monotonic()
+            expired = [name for name, layer in self.layers.items() if layer[3] is not None and layer[3] <= now]
+            for name in expired:
+                del self.layers[name]
+            if expired or self.dirty:
+                self.dirty = False
+                break
+            expiries = [layer[3] for layer in self.layers.values() if layer[3] is not None]
+            self.changed.wait(min(expiries) - now if expiries else None)
+        if not self.layers:
+            return [" " * self.columns] * self.rows
+        return max(self.layers.values(), key=lambda layer: (layer[0], layer[1]))[2]
+
+    def _run(self):
+        while True:
+            with self.changed:
+                frame = self._wait_for_change()
+            for row, (old, new) in enumerate(zip(self.shown, frame)):
+                changed = [column for column in range(self.columns) if old[column] != new[column]]
+                # One unchanged cell costs the same as a cursor command, so runs with 1-cell gaps are merged
+                runs = []
+                for column in changed:
+                    if runs and column - runs[-1][1] <= 2:
+                        runs[-1][1] = column
+                    else:
+                        runs.append([column, column])
+                for start, end in runs:
+                    self.lcd.cursor_position(start, row)
+                    self.lcd.message = new[start:end + 1]
+                    self.cells_written += end + 1 - start
+            self.shown = list(frame)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+import fcntl
+import hashlib
+import os
+from contextlib import contextmanager
+from watcher import file_signature
+
+@contextmanager
+def locked(path):
+    """
+    Opens path for appending with an exclusive flock held until the block ends.
+    processing.py replaces input.txt by renaming a compacted copy over it while holding
+    this lock, so if the file was replaced while we waited we lock the new one instead.
+    """
+    while True:
+        file = open(path, 'a+')
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+        try:
+            current = os.stat(path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current == os.fstat(file.fileno()).st_ino:
+            break
+        file.close()
+    try:
+        yield file
+    finally:
+        file.close()  # Closing releases the lock
+
+def _digest(line):
+    return hashlib.sha1(line.encode()).digest()
+
+class EventLog:
+    """
+    Appends submitted events to input.txt, skipping submissions that cannot change the schedule.
+    A holiday line is skipped if the same line is already in the log (holidays only ever add
+    days). An exam line is skipped only if it is identical to the last line for its slot,
+    since an older line may have been painted over since. Midsem and endsem lines for a
+    slot paint over each other in the calendar, so the slot alone is the key.
+    The index of hashes is rebuilt from the file whenever someone else changed it.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.signature = None
+        self.seen = set()  # Digests of holiday (and unparseable) lines
+        self.last_for_slot = {}  # slot -> digest of the newest line for it
+
+    def _index(self, line):
+        parts = line.split(',')
+        if parts[0] in ('1', '2') and len(parts) > 1:
+            self.last_for_slot[parts[1]] = _digest(line)
+        else:
+            self.seen.add(_digest(line))
+
+    def _is_repeat(self, line):
+        parts = line.split(',')
+        if parts[0] in ('1', '2') and len(parts) > 1:
+            return self.last_for_slot.get(parts[1]) == _digest(line)
+        return _digest(line) in self.seen
+
+    def _refresh(self, file):
+        if file_signature(self.path) == self.signature:
+            return
+        self.seen.clear()
+        self.last_for_slot.clear()
+        file.seek(0)
+        for line in file:
+            if line.strip():
+                self._index(line.strip())
+
+    def append(self, lines):
+        """
+        Appends the new lines with a single write and fsync.
+        Returns (written, skipped as duplicates).
+        """
+        with locked(self.path) as file:
+            self._refresh(file)
+            new_lines = []
+            for line in lines:
+                if self._is_repeat(line):
+                    continue
+                self._index(line)
+                new_lines.append(line)
+            if new_lines:
+                file.write("".join(line + '\n' for line in new_lines))
+                file.flush()
+                os.fsync(file.fileno())
+            self.signature = file_signature(self.path)
+        return len(new_lines), len(lines) - len(new_lines)
+
+def _check_slot_repeats():
+    """
+    A midsem line, an endsem line for the same slot and the midsem line again must all be
+    written, and the calendar must end up with the midsem bell.
+    """
+    import tempfile
+    from datetime import date
+    from processing import read_and_process_events
+
+    a = "1,1,05-05-2025,05-05-2025,09:00:00"
+    b = "2,1,05-05-2025,05-05-2025,14:00:00"
+    with tempfile.TemporaryDirectory(prefix="bell-event-log-") as workdir:
+        path = os.path.join(workdir, "input.txt")
+        log = EventLog(path)
+        results = [log.append([line]) for line in (a, b, a)]
+        assert results == [(1, 0)] * 3, results
+        assert log.append([a]) == (0, 1)  # Now it really is a repeat
+        event_type, event_time = read_and_process_events(path).events_on(date(2025, 5, 5))[1]
+        assert (event_type, event_time.strftime("%H:%M:%S")) == (1, "09:00:00"), (event_type, event_time)
+    print("event_log: A/B/A for one slot compiles to A")
+
+if __name__ == "__main__":
+    # python3 event_log.py checks the repeat detection against the compiler
+    _check_slot_repeats()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import mmap
+import struct
+from datetime import datetime, timedelta
+from bell_timetable import BELL_DURATION
+
+# File layout: one header, then fixed-width records sorted by fire time.
+# Epochs are local wall-clock times converted with datetime.timestamp(), same as time.time().
+HEADER = struct.Struct("<4sHHqq")  # magic, version, record size, first covered second, end of coverage
+RECORD = struct.Struct("<qHHB")  # fire epoch, duration in seconds, zone (slot, 0 = regular), reason code
+RECORD_DTYPE = [("epoch", "<i8"), ("duration", "<u2"), ("zone", "<u2"), ("reason", "u1")]  # Same layout as RECORD
+EPOCH = struct.Struct("<q")
+MAGIC = b"BELL"
+VERSION = 2  # 2: zone widened to 16 bits
+FIRE_TABLE_DAYS = 366  # Days compiled ahead; the scheduler falls back to final.txt past the end
+
+def pack_fire_table(calendar, start_day, days=FIRE_TABLE_DAYS):
+    """
+    Compiles every bell from start_day for the given number of days into the binary table.
+    """
+    # NumPy is only needed to compile a table, reading one (the scheduler's hot path) does not load it
+    import numpy as np
+    from timeline import TermTimeline, to_epoch
+
+    times, zones, reasons = TermTimeline(calendar, start_day, start_day + timedelta(days=days - 1)).fire_schedule()
+    if len(zones) and zones.max() > 0xFFFF:
+        raise ValueError(f"Slot {zones.max()} does not fit in a fire table record")
+    records = np.zeros(len(times), dtype=RECORD_DTYPE)
+    records["epoch"] = to_epoch(times)
+    records["duration"] = BELL_DURATION
+    records["zone"] = zones
+    records["reason"] = reasons
+
+    start = int(datetime.combine(start_day, datetime.min.time()).timestamp())
+    end = int(datetime.combine(start_day + timedelta(days=days), datetime.min.time()).timestamp())
+    return HEADER.pack(MAGIC, VERSION, RECORD.size, start, end) + records.tobytes()
+
+class FireTable:
+    """
+    Read-only view of a packed fire table, either a memory-mapped file or bytes.
+    Lookups are binary searches over the records; nothing is parsed up front.
+    """
+    def __init__(self, buffer):
+        magic, version, record_size, self.start, self.end = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError("Not a fire table or written by an incompatible version")
+        if (len(buffer) - HEADER.size) % RECORD.size:
+            raise ValueError("Truncated fire table")
+        self.buffer = buffer
+        self.count = (len(buffer) - HEADER.size) // RECORD.size
+
+    @classmethod
+    def open(cls, path):
+        with open(path, 'rb') as file:
+            # The mapping stays valid after the compiler renames a new table over the path
+            return cls(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self):
+        if isinstance(self.buffer, mmap.mmap):
+            self.buffer.close()
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self.count:
+            raise IndexError(index)
+        return RECORD.unpack_from(self.buffer, HEADER.size + index * RECORD.size)
+
+    def covers(self, start, end):
+        return self.start <= start and end <= self.end
+
+    def bisect(self, epoch):
+        """
+        Index of the first record firing at or after epoch (len(self) if there is none).
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if EPOCH.unpack_from(self.buffer, HEADER.size + middle * RECORD.size)[0] < epoch:
+                low = middle + 1
+            else:
+                high = middle
+        return low
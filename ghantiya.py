@@ -1,8 +1,7 @@
-import RPi.GPIO as GPIO
 import time
-GPIO.setmode(GPIO.BCM)
-GPIO.setup(4,GPIO.OUT)
+import relay
 
-GPIO.output(4,GPIO.HIGH)
-time.sleep(2)
-GPIO.output(4,GPIO.LOW)
\ No newline at end of file
+ticket = relay.ring_bell(2, source="ghantiya")
+# Wait for the relay daemon to finish the pulse
+while relay.relay_status(ticket["ticket"])["status"] != "done":
+    time.sleep(0.2)
@@ -1,74 +1,31 @@
 #!/usr/bin/env python3
-import RPi.GPIO as GPIO
+import logging
 import time
-from datetime import datetime, timedelta
 import threading
-import digitalio
-import board
-from adafruit_character_lcd.character_lcd import Character_LCD_Mono
+import relay
+import control
+import hardware
+from display import Compositor
+from log_config import setup_logging
 
-# === GPIO Pin Configuration ===
-LCD_RS = board.D17      # GPIO17 (Pin 11)
-LCD_E = board.D27       # GPIO27 (Pin 13)
-LCD_D4 = board.D22      # GPIO22 (Pin 15)
-LCD_D5 = board.D23      # GPIO23 (Pin 16)
-LCD_D6 = board.D24      # GPIO24 (Pin 18)
-LCD_D7 = board.D25      # GPIO25 (Pin 22)
+# === Hardware ===
 LCD_COLUMNS = 16
 LCD_ROWS = 2
-
-ROW = [board.D5, board.D6, board.D13, board.D19]  # GPIO5, GPIO6, GPIO13, GPIO19 (Pins 29, 31, 33, 35)
-COL = [board.D12, board.D16, board.D20, board.D21]  # GPIO12, GPIO16, GPIO20, GPIO21 (Pins 32, 36, 38, 40)
-
-
+CLOCK_PRIORITY = 0  # Display layers: the clock, covered by the menus, covered by alerts
+MENU_PRIORITY = 1
+ALERT_PRIORITY = 2
+BELL_MESSAGE_SECONDS = 5  # How long "Bell Ringing" covers the clock and menus
 
 # === System Variables ===
-schedule_list = []  # Stores scheduled times
 temp_time = None    # Temporarily holds entered time
 lcd_updating = True # Controls whether the LCD updates in real-time
-last_lcd_message = ""  # Variable to track the last LCD message
 show_rtc = True  # Controls if real-time clock is shown
-last_input_time = time.time()  # Track the last input time to handle inactivity
+clock = hardware.CLOCK  # Wall and monotonic time, a VirtualClock in simulations
+last_input_time = clock.time()  # Track the last input time to handle inactivity
+RECONNECT_SECONDS = 5  # Wait before subscribing again when the scheduler is not running
+KEY_WAIT = 1  # Seconds the main loop waits for a key before checking the inactivity timeout again
+logger = logging.getLogger("keypad")
  
-GPIO.setmode(GPIO.BCM)
-relay_pin=4
-GPIO.setup(relay_pin,GPIO.OUT)
-# === GPIO Setup ===
-lcd_rs = digitalio.DigitalInOut(LCD_RS)
-lcd_rs.direction = digitalio.Direction.OUTPUT
-
-lcd_e = digitalio.DigitalInOut(LCD_E)
-lcd_e.direction = digitalio.Direction.OUTPUT
-
-lcd_d4 = digitalio.DigitalInOut(LCD_D4)
-lcd_d4.direction = digitalio.Direction.OUTPUT
-
-lcd_d5 = digitalio.DigitalInOut(LCD_D5)
-lcd_d5.direction = digitalio.Direction.OUTPUT
-
-lcd_d6 = digitalio.DigitalInOut(LCD_D6)
-lcd_d6.direction = digitalio.Direction.OUTPUT
-
-lcd_d7 = digitalio.DigitalInOut(LCD_D7)
-lcd_d7.direction = digitalio.Direction.OUTPUT
-
-keypad_row = []
-keypad_col = []
-
-for pin in ROW:
-    row = digitalio.DigitalInOut(pin)
-    row.direction = digitalio.Direction.OUTPUT
-    row.value = False
-    keypad_row.append(row)
-
-for pin in COL:
-    col = digitalio.DigitalInOut(pin)
-    col.direction = digitalio.Direction.INPUT
-    col.pull = digitalio.Pull.DOWN
-    keypad_col.append(col)
-
-lcd = Character_LCD_Mono(lcd_rs, lcd_e, lcd_d4, lcd_d5, lcd_d6, lcd_d7, LCD_COLUMNS, LCD_ROWS)
-
 KEYPAD = [
     ['1', '2', '3', 'A'],
     ['4', '5', '6', 'B'],
@@ -76,29 +33,23 @@ KEYPAD = [
     ['*', '0', '#', 'D']
 ]
 
+# The real LCD and keypad, or in-memory ones with BELL_HARDWARE=sim
+display = Compositor(hardware.open_lcd(LCD_COLUMNS, LCD_ROWS), LCD_COLUMNS, LCD_ROWS)
+keypad = hardware.open_keypad(KEYPAD)
+
 # === Functions ===
 def update_lcd(text):
     """
-    Updates the LCD with the given text only if the content has changed.
+    Shows the given menu text. The display thread sends only the characters that changed.
     """
-    global last_lcd_message
-    if text != last_lcd_message:
-        lcd.clear()  # Clear LCD only if the content changes
-        lcd.message = text
-        last_lcd_message = text
+    display.show("menu", text, MENU_PRIORITY)
 
-def read_keypad():
+def read_keypad(timeout=None):
     """
-    Scans the keypad and returns the pressed key. Returns None if no key is pressed.
+    Waits for the next key press and returns it, or None if none came within timeout seconds.
+    Presses are queued by the keypad's interrupt handler, so none are lost while the UI is busy.
     """
-    for i, row_pin in enumerate(keypad_row):
-        row_pin.value = True
-        for j, col_pin in enumerate(keypad_col):
-            if col_pin.value:
-                row_pin.value = False
-                return KEYPAD[i][j]
-        row_pin.value = False
-    return None
+    return keypad.get_key(timeout)
 
 def real_time_clock():
     """
@@ -107,33 +58,32 @@ def real_time_clock():
     global show_rtc
     while lcd_updating:
         if show_rtc:
-            current_time = datetime.now()
-            update_lcd(current_time.strftime("%H:%M:%S\n%d-%m-%Y"))
-        time.sleep(1)
+            current_time = clock.now()
+            display.hide("menu")  # Back to the clock after exiting the menus
+            display.show("clock", current_time.strftime("%H:%M:%S\n%d-%m-%Y"), CLOCK_PRIORITY)
+        clock.sleep(1 - clock.time() % 1)  # Tick on the second boundary
 
 def ring_bell():
-    GPIO.output(relay_pin,GPIO.HIGH)
-    time.sleep(5)
-    GPIO.output(relay_pin,GPIO.LOW)
+    try:
+        relay.ring_bell(5, source="keypad")  # Returns at once, the relay daemon times the pulse
+    except OSError as e:
+        logger.error(f"Relay daemon did not confirm the bell: {e}")
 
 
-def check_schedule():
+def watch_bells():
     """
-    Checks the schedule list every second and rings the bell
-    if the current time matches any scheduled time.
+    Shows "Bell Ringing" whenever the scheduler rings, as it pushes the event over its
+    control socket; nothing is polled. Subscribes again if the scheduler restarts.
     """
-    global schedule_list
     while lcd_updating:
-        # Get current time with seconds
-        current_time = datetime.now().strftime("%H:%M:%S")
-        
-        for scheduled_time in schedule_list[:]:  # Iterate over a copy of the list
-            if scheduled_time.strftime("%H:%M:%S") == current_time:
-                update_lcd(f"Bell Ringing\n{current_time}")
-                ring_bell()
-                schedule_list.remove(scheduled_time)  # Remove the matched time
-        
-        time.sleep(1)  # Check every second
+        try:
+            for event in control.subscribe():
+                if event["event"] == "rung":
+                    rung_at = time.strftime("%H:%M:%S", time.localtime(event["at"]))
+                    display.show("alert", f"Bell Ringing\n{rung_at}", ALERT_PRIORITY, timeout=BELL_MESSAGE_SECONDS)
+        except (OSError, ValueError) as e:
+            logger.debug("Scheduler control socket unavailable: %s", e)
+        time.sleep(RECONNECT_SECONDS)
 
 def handle_mode_selection():
     """
@@ -170,19 +120,14 @@ def enter_time_mode():
     input_time = ''
     while True:
         key = read_keypad()
-        if key is None:
-            continue
         if key == '#':  # Confirm input
             break
         elif key == '*':  # Cancel input
             input_time = input_time[:-1]
             update_lcd(f"Time {input_time} min")
-            time.sleep(0.5)
-            
         elif key.isdigit():  # Append digits to input
             input_time += key
             update_lcd(f"Time: {input_time} min")
-            time.sleep(0.5)
     
     if input_time.isdigit() and int(input_time) > 0:
         temp_time = int(input_time)
@@ -194,33 +139,41 @@ def enter_time_mode():
 
 def confirm_schedule():
     """
-    Confirms and saves the entered time to the schedule.
+    Confirms the entered time and submits it to the scheduler, which rings the bell.
     """
     global temp_time
     if temp_time is not None:
-        future_time = datetime.now() + timedelta(minutes=temp_time)
-        schedule_list.append(future_time)
-        update_lcd(f"Set for: {future_time.strftime('%H:%M')}")
-        temp_time = None
+        try:
+            timer = control.submit(temp_time * 60, duration=5, source="keypad")
+            update_lcd(f"Set for: {time.strftime('%H:%M', time.localtime(timer['due']))}")
+            temp_time = None
+        except OSError as e:
+            logger.error(f"Cannot submit the bell to the scheduler: {e}")
+            update_lcd("Scheduler down!\nTry again")
     else:
         update_lcd("No Time Entered!")
     time.sleep(2)
 
 def clear_schedule():
     """
-    Clears all scheduled tasks.
+    Cancels every pending bell entered on the keypad.
     """
-    global schedule_list
-    schedule_list.clear()
-    update_lcd("Schedule Cleared")
+    try:
+        for timer in control.list_timers():
+            if timer["source"] == "keypad":
+                control.cancel(timer["id"])
+        update_lcd("Schedule Cleared")
+    except OSError as e:
+        logger.error(f"Cannot reach the scheduler: {e}")
+        update_lcd("Scheduler down!\nTry again")
     time.sleep(2)
 
 # === Main Program ===
 def main():
     global lcd_updating, show_rtc, last_input_time
-    # Start real-time clock and schedule checking threads
+    # Start the real-time clock and the bell watcher threads
     threading.Thread(target=real_time_clock, daemon=True).start()
-    threading.Thread(target=check_schedule, daemon=True).start()
+    threading.Thread(target=watch_bells, daemon=True).start()
 
     # Ensure LCD is initialized with a short delay
     time.sleep(2)
@@ -228,12 +181,12 @@ def main():
     try:
         while True:
             # Check if 30 seconds have passed since last keypress
-            current_time = time.time()
+            current_time = clock.time()
 
 
+            key = read_keypad(KEY_WAIT)  # Blocks until a key is pressed or KEY_WAIT seconds pass
             # Show RTC or handle keypresses
             if show_rtc:
-                key = read_keypad()
                 if key == 'A':
                     show_rtc = False  # Hide RTC and show modes
                     handle_mode_selection()
@@ -246,19 +199,17 @@ def main():
                 elif key == 'D':
                     ring_bell()
                     break
-                 
-
-            time.sleep(0.1)  # Prevent busy-wait loop
     except KeyboardInterrupt:
-        print("\nProgram interrupted by user.")
+        logger.info("Program interrupted by user.")
     finally:
         # Cleanup and stop LCD updates
         lcd_updating = False
-        lcd.clear()
-        print("Program Exiting")
+        display.clear()
+        logger.info("Program Exiting")
 
 # Run the main function
 if __name__=="__main__":
+    setup_logging("keypad")
     while True:
         main()
         time.sleep(2)
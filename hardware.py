@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+BACKEND = os.environ.get("BELL_HARDWARE", "pi")  # "pi" drives the real pins, "sim" keeps everything in memory
+
+# === Clocks ===
+class SystemClock:
+    """
+    The real clocks. Code that reads the time through a clock object can be run on a VirtualClock instead.
+    """
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+    def now(self):
+        return datetime.now()
+
+class VirtualClock:
+    """
+    Clock that only moves when someone sleeps on it, so a loop that sleeps until its next
+    bell replays weeks in seconds. Starts at the wall-clock epoch start.
+    """
+    def __init__(self, start):
+        self.wall = float(start)
+        self.mono = 0.0
+        self.lock = threading.Lock()
+
+    def time(self):
+        return self.wall
+
+    def monotonic(self):
+        return self.mono
+
+    def now(self):
+        return datetime.fromtimestamp(self.wall)
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.wall += max(0, seconds)
+            self.mono += max(0, seconds)
+
+    def step(self, seconds):
+        """
+        Moves only the wall clock, like NTP correcting the time after boot.
+        """
+        with self.lock:
+            self.wall += seconds
+
+CLOCK = SystemClock()
+
+# === Relay ===
+class SimGPIO:
+    """
+    The part of RPi.GPIO the relay actuator uses. Every output change is recorded with its time.
+    """
+    BCM = "BCM"
+    OUT = "OUT"
+    IN = "IN"
+    HIGH = 1
+    LOW = 0
+
+    def __init__(self, clock=CLOCK):
+        self.clock = clock
+        self.levels = {}
+        self.changes = []  # (epoch, pin, level)
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, enabled):
+        pass
+
+    def setup(self, pin, direction, **kwargs):
+        self.levels.setdefault(pin, self.LOW)
+
+    def output(self, pin, level):
+        if self.levels.get(pin) != level:
+            self.changes.append((self.clock.time(), pin, level))
+        self.levels[pin] = level
+
+    def input(self, pin):
+        return self.levels.get(pin, self.LOW)
+
+    def cleanup(self, *pins):
+        pass
+
+    def pulses(self, pin):
+        """
+        Returns [(started, ended)] for every time the pin went high; ended is None while it is still high.
+        """
+        pulses = []
+        for epoch, changed_pin, level in self.changes:
+            if changed_pin != pin:
+                continue
+            if level == self.HIGH:
+                pulses.append((epoch, None))
+            elif pulses and pulses[-1][1] is None:
+                pulses[-1] = (pulses[-1][0], epoch)
+        return pulses
+
+class SimRelay:
+    """
+    Stands in for the relay daemon's client (relay.ring_bell / relay.relay_status) and
+    records every ring request with the time it was made.
+    """
+    def __init__(self, clock=CLOCK):
+        self.clock = clock
+        self.rings = []  # (epoch, duration, source)
+
+    def ring_bell(self, duration, source=""):
+        now = self.clock.time()
+        self.rings.append((now, duration, source))
+        return {"ticket": str(len(self.rings)), "status": "done", "source": source, "duration": duration,
+                "requested_at": now, "started_at": now, "finished_at": now + duration}
+
+    def relay_status(self, ticket_id):
+        index = int(ticket_id) - 1
+        if not 0 <= index < len(self.rings):
+            return None
+        epoch, duration, source = self.rings[index]
+        return {"ticket": ticket_id, "status": "done", "started_at": epoch, "finished_at": epoch + duration}
+
+def relay_gpio():
+    """
+    GPIO module for the relay actuator: RPi.GPIO on the Pi, a SimGPIO with the sim backend.
+    """
+    if BACKEND == "sim":
+        return SimGPIO()
+    import RPi.GPIO as GPIO
+    return GPIO
+
+# === LCD ===
+class SimLCD:
+    """
+    In-memory HD44780 with the Character_LCD_Mono interface used here (clear, message,
+    cursor_position). Keeps the visible text and counts the characters and commands sent.
+    """
+    def __init__(self, columns, lines):
+        self.columns = columns
+        self.lines = lines
+        self.cells = [[" "] * columns for _ in range(lines)]
+        self.column = 0
+        self.row = 0
+        self.chars_written = 0
+        self.commands = 0
+
+    def clear(self):
+        self.cells = [[" "] * self.columns for _ in range(self.lines)]
+        self.column = self.row = 0
+        self.commands += 1
+
+    def cursor_position(self, column, row):
+        self.column = min(column, self.columns - 1)
+        self.row = min(row, self.lines - 1)
+        self.commands += 1
+
+    @property
+    def message(self):
+        return self.text()
+
+    @message.setter
+    def message(self, text):
+        start_column = self.column
+        for char in text:
+            if char == "\n":
+                self.row = min(self.row + 1, self.lines - 1)
+                self.column = start_column
+                self.commands += 1
+                continue
+            if self.column < self.columns:
+                self.cells[self.row][self.column] = char
+            self.column += 1
+            self.chars_written += 1
+
+    def text(self):
+        return "\n".join("".join(row).rstrip() for row in self.cells)
+
+def open_lcd(columns, lines):
+    """
+    The 16x2 LCD on GPIO17/27 (RS/E) and GPIO22-25 (D4-D7), or a SimLCD with the sim backend.
+    """
+    if BACKEND == "sim":
+        return SimLCD(columns, lines)
+    import board
+    import digitalio
+    from adafruit_character_lcd.character_lcd import Character_LCD_Mono
+    pins = []
+    for pin in (board.D17, board.D27, board.D22, board.D23, board.D24, board.D25):
+        io = digitalio.DigitalInOut(pin)
+        io.direction = digitalio.Direction.OUTPUT
+        pins.append(io)
+    return Character_LCD_Mono(*pins, columns, lines)
+
+# === Keypad ===
+KEYPAD_ROW_PINS = (5, 6, 13, 19)  # BCM, driven by us
+KEYPAD_COL_PINS = (12, 16, 20, 21)  # BCM, pulled down and read back
+DEBOUNCE_SECONDS = 0.02  # The columns must read the same twice this far apart to count
+
+class MatrixKeypad:
+    """
+    4x4 matrix keypad read on interrupts instead of a scan loop. While idle every row is driven
+    high, so pressing any key raises its column and fires an edge callback. The keypad thread
+    then waits for the contacts to settle, finds the row, queues the key once and waits for the
+    release before listening again, so a held or bouncing key is never read twice.
+    """
+    def __init__(self, layout, gpio=None):
+        if gpio is None:
+            import RPi.GPIO as gpio
+        self.gpio = gpio
+        self.layout = layout
+        self.keys = queue.Queue()
+        self.edge = threading.Event()
+        gpio.setmode(gpio.BCM)
+        for pin in KEYPAD_ROW_PINS:
+            gpio.setup(pin, gpio.OUT, initial=gpio.HIGH)
+        for pin in KEYPAD_COL_PINS:
+            gpio.setup(pin, gpio.IN, pull_up_down=gpio.PUD_DOWN)
+            gpio.add_event_detect(pin, gpio.RISING, callback=lambda channel: self.edge.set())
+        threading.Thread(target=self._run, name="keypad", daemon=True).start()
+
+    def _columns(self):
+        return tuple(self.gpio.input(pin) for pin in KEYPAD_COL_PINS)
+
+    def _settled(self):
+        """
+        Reads the columns until two reads DEBOUNCE_SECONDS apart agree.
+        """
+        previous = self._columns()
+        while True:
+            time.sleep(DEBOUNCE_SECONDS)
+            current = self._columns()
+            if current == previous:
+                return current
+            previous = current
+
+    def _locate(self):
+        """
+        Drives one row at a time to find the pressed key. Returns None if it was already let go.
+        """
+        gpio = self.gpio
+        key = None
+        for pin in KEYPAD_ROW_PINS:
+            gpio.output(pin, gpio.LOW)
+        for i, row_pin in enumerate(KEYPAD_ROW_PINS):
+            gpio.output(row_pin, gpio.HIGH)
+            for j, col_pin in enumerate(KEYPAD_COL_PINS):
+                if gpio.input(col_pin):
+                    key = self.layout[i][j]
+                    break
+            gpio.output(row_pin, gpio.LOW)
+            if key is not None:
+                break
+        for pin in KEYPAD_ROW_PINS:
+            gpio.output(pin, gpio.HIGH)
+        return key
+
+    def _run(self):
+        while True:
+            self.edge.wait()  # Sleeps until a column rises, no CPU while idle
+            self.edge.clear()  # Edges from our own row scan and the release land here and find nothing pressed
+            if not any(self._settled()):
+                continue  # Noise or a bounce that came to nothing
+            key = self._locate()
+            if key is not None:
+                self.keys.put(key)
+            while any(self._settled()):
+                pass  # Held down: wait for the release
+
+    def get_key(self, timeout=None):
+        """
+        Waits for the next key press and returns it, or None after timeout seconds.
+        """
+        try:
+            return self.keys.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class SimKeypad:
+    """
+    Keypad whose keys are pressed from code: press(key) queues one key press.
+    """
+    def __init__(self, layout):
+        self.layout = layout
+        self.valid = {key for row in layout for key in row}
+        self.keys = queue.Queue()
+
+    def press(self, key):
+        if key not in self.valid:
+            raise ValueError(f"No key {key!r} on the keypad")
+        self.keys.put(key)
+
+    get_key = MatrixKeypad.get_key
+
+def open_keypad(layout):
+    return SimKeypad(layout) if BACKEND == "sim" else MatrixKeypad(layout)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import json
+import os
+import socket
+import socketserver
+import threading
+
+class _Handler(socketserver.StreamRequestHandler):
+    """
+    Reads one JSON message per line and writes one JSON reply per line.
+    A reply that is an iterator (a generator) is a stream: every item is written as its
+    own line until the iterator ends or the client hangs up, and the connection ends with it.
+    """
+    def handle(self):
+        for raw_line in self.rfile:
+            if not raw_line.strip():
+                continue
+            try:
+                reply = self.server.handle_message(json.loads(raw_line))
+            except Exception as e:
+                reply = {"status": "error", "message": str(e)}
+            if not hasattr(reply, "__next__"):
+                self.wfile.write((json.dumps(reply) + "\n").encode())
+                continue
+            try:
+                for item in reply:
+                    self.wfile.write((json.dumps(item) + "\n").encode())
+            except OSError:
+                pass  # Subscriber went away
+            finally:
+                reply.close()
+            return
+
+def serve(path, handle_message):
+    """
+    Serves newline-delimited JSON requests on a Unix domain socket from a background thread.
+    handle_message(message) is called for every request and returns the reply dict.
+    """
+    if os.path.exists(path):
+        os.remove(path)  # Stale socket left behind by a previous run
+    server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+    server.daemon_threads = True
+    server.handle_message = handle_message
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def request(path, message, timeout=1.0):
+    """
+    Sends one JSON message to the socket at path and returns the decoded reply.
+    Raises OSError if nobody is listening.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall((json.dumps(message) + "\n").encode())
+        reply = sock.makefile('rb').readline()
+    if not reply:
+        raise ConnectionError(f"No reply from {path}")
+    return json.loads(reply)
+
+def stream(path, message, timeout=1.0):
+    """
+    Sends one JSON message and yields every line the server streams back, decoded, until it
+    closes the connection. Raises OSError if nobody is listening.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path)
+        sock.sendall((json.dumps(message) + "\n").encode())
+        sock.settimeout(None)  # Streams stay open, the server sends keepalives
+        for line in sock.makefile('rb'):
+            yield json.loads(line)
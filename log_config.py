@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+import logging
+import os
+import sys
+import threading
+import time
+from logging.handlers import MemoryHandler, RotatingFileHandler
+
+LOG_DIR = os.environ.get("BELL_LOG_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs"))
+LOG_LEVEL = os.environ.get("BELL_LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = 256 * 1024  # Rotate each daemon's log at this size
+LOG_BACKUPS = 3  # Rotated files kept, so at most 1 MB per daemon on the SD card
+BUFFER_RECORDS = 100  # Records held in memory before a write
+FLUSH_INTERVAL = 10  # Seconds a buffered record may wait; warnings and errors are written at once
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+class TimedMemoryHandler(MemoryHandler):
+    """
+    MemoryHandler that is also flushed FLUSH_INTERVAL seconds after the oldest buffered record,
+    so quiet daemons still get their logs on disk without a write per line.
+    """
+    def __init__(self, capacity, flush_interval, target, flushLevel=logging.WARNING):
+        super().__init__(capacity, flushLevel=flushLevel, target=target, flushOnClose=True)
+        self.flush_interval = flush_interval
+        threading.Thread(target=self._flush_periodically, daemon=True).start()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+class RepeatFilterHandler(logging.Handler):
+    """
+    Passes records on to the targets, but swallows a message identical to the previous one
+    (same logger, level and text) and later writes "last message repeated N times" instead:
+    when a different message arrives, on flush, and with summary_interval at least that often,
+    so a burst followed by silence is not left uncounted.
+    """
+    def __init__(self, *targets, summary_interval=None):
+        super().__init__()
+        self.targets = targets
+        self.last = None
+        self.last_record = None
+        self.repeats = 0
+        if summary_interval:
+            threading.Thread(target=self._summarise_periodically, args=(summary_interval,), daemon=True).start()
+
+    def _summarise_periodically(self, interval):
+        while True:
+            time.sleep(interval)
+            with self.lock:
+                self._summarise()
+
+    def emit(self, record):
+        key = (record.name, record.levelno, record.getMessage())
+        with self.lock:
+            if key == self.last:
+                self.repeats += 1
+                return
+            self._summarise()
+            self.last, self.last_record = key, record
+        self._forward(record)
+
+    def _forward(self, record):
+        for target in self.targets:
+            if record.levelno >= target.level:
+                target.handle(record)
+
+    def _summarise(self):
+        if self.repeats:
+            record = self.last_record
+            summary = logging.LogRecord(record.name, record.levelno, record.pathname, record.lineno,
+                                        f"last message repeated {self.repeats} times", None, None)
+            self._forward(summary)
+            self.repeats = 0
+
+    def flush(self):
+        with self.lock:
+            self._summarise()
+            self.last = None
+        for target in self.targets:
+            target.flush()
+
+    def close(self):
+        self.flush()
+        for target in self.targets:
+            target.close()
+        super().close()
+
+def setup_logging(name):
+    """
+    Sends the root logger to logs/<name>.log through a repeat filter and a write buffer.
+    The level comes from BELL_LOG_LEVEL (DEBUG shows the per-second status lines).
+    Warnings and errors are also printed to stderr.
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    formatter = logging.Formatter(LOG_FORMAT)
+    file_handler = RotatingFileHandler(os.path.join(LOG_DIR, f"{name}.log"), maxBytes=LOG_MAX_BYTES,
+                                       backupCount=LOG_BACKUPS)
+    file_handler.setFormatter(formatter)
+    buffered = TimedMemoryHandler(BUFFER_RECORDS, FLUSH_INTERVAL, file_handler)
+
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(formatter)
+    console.setLevel(logging.WARNING)
+
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(RepeatFilterHandler(buffered, console, summary_interval=FLUSH_INTERVAL))
+    return logging.getLogger(name)
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+import functools
+import json
+import logging
+import os
+import threading
+import time
+
+METRICS_DIR = os.environ.get("BELL_METRICS_DIR", "/dev/shm/cu-bell-metrics")  # tmpfs, costs no SD card writes
+PUBLISH_INTERVAL = 15  # Seconds between snapshots written by each daemon
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+logger = logging.getLogger("metrics")
+
+class Metric:
+    """
+    Base for the three metric types. Values are kept per label set; the unlabelled
+    value uses the empty label set.
+    """
+    kind = None
+
+    def __init__(self, name, help_text, registry):
+        self.name = name
+        self.help = help_text
+        self.lock = threading.Lock()
+        self.values = {}
+        registry.metrics[name] = self
+
+    def labels(self, **labels):
+        return LabelledMetric(self, tuple(sorted(labels.items())))
+
+    def samples(self):
+        with self.lock:
+            return [{"labels": dict(key), "value": value} for key, value in self.values.items()]
+
+class LabelledMetric:
+    def __init__(self, metric, key):
+        self.metric = metric
+        self.key = key
+
+    def __getattr__(self, name):
+        method = getattr(self.metric, name)
+        return lambda *args, **kwargs: method(*args, _key=self.key, **kwargs)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, _key=()):
+        with self.lock:
+            self.values[_key] = self.values.get(_key, 0) + amount
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, _key=()):
+        with self.lock:
+            self.values[_key] = value
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, registry, buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, _key=()):
+        with self.lock:
+            entry = self.values.get(_key)
+            if entry is None:
+                entry = self.values[_key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["counts"][i] += 1
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def time(self, _key=()):
+        """
+        Times a block (with ...time():) or every call of a function (@...time()).
+        """
+        return Timer(self, _key)
+
+    def samples(self):
+        with self.lock:
+            return [{"labels": dict(key), "buckets": list(self.buckets), "counts": list(entry["counts"]),
+                     "sum": entry["sum"], "count": entry["count"]} for key, entry in self.values.items()]
+
+class Timer:
+    def __init__(self, histogram, key):
+        self.histogram = histogram
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, _key=self.key)
+
+    def __call__(self, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Timer(self.histogram, self.key):
+                return function(*args, **kwargs)
+        return wrapper
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+
+    def counter(self, name, help_text):
+        return Counter(name, help_text, self)
+
+    def gauge(self, name, help_text):
+        return Gauge(name, help_text, self)
+
+    def histogram(self, name, help_text, buckets=LATENCY_BUCKETS):
+        return Histogram(name, help_text, self, buckets)
+
+    def snapshot(self):
+        return {name: {"type": metric.kind, "help": metric.help, "samples": metric.samples()}
+                for name, metric in self.metrics.items()}
+
+REGISTRY = Registry()  # Metrics of this process
+counter, gauge, histogram = REGISTRY.counter, REGISTRY.gauge, REGISTRY.histogram
+
+def publish(name, registry=REGISTRY):
+    """
+    Writes this process's metrics to METRICS_DIR/<name>.json for the Flask app to serve.
+    """
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"{name}.json")
+    with open(path + ".tmp", 'w') as file:
+        json.dump({"published_at": time.time(), "metrics": registry.snapshot()}, file)
+    os.replace(path + ".tmp", path)
+
+def start_publisher(name, registry=REGISTRY, interval=PUBLISH_INTERVAL):
+    """
+    Publishes the metrics now and then every interval seconds from a daemon thread.
+    """
+    def run():
+        while True:
+            try:
+                publish(name, registry)
+            except OSError as e:
+                logger.warning(f"Cannot publish metrics to {METRICS_DIR}: {e}")
+            time.sleep(interval)
+    threading.Thread(target=run, daemon=True).start()
+
+def read_published():
+    """
+    Returns {process name: (published_at, metrics snapshot)} for every daemon that published.
+    """
+    published = {}
+    try:
+        names = sorted(os.listdir(METRICS_DIR))
+    except FileNotFoundError:
+        return published
+    for file_name in names:
+        if not file_name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(METRICS_DIR, file_name)) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue  # Being replaced right now, picked up on the next scrape
+        published[file_name[:-5]] = (data["published_at"], data["metrics"])
+    return published
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{str(value)}"'.replace("\n", " ") for key, value in sorted(labels.items())) + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+def render(sources):
+    """
+    Renders [(extra labels, metrics snapshot)] in the Prometheus text format,
+    merging metrics with the same name from different processes (a sample's own labels win).
+    """
+    merged = {}
+    for extra, snapshot in sources:
+        for name, metric in snapshot.items():
+            entry = merged.setdefault(name, {"type": metric["type"], "help": metric["help"], "samples": []})
+            entry["samples"].extend(({**sample, "labels": {**extra, **sample["labels"]}}) for sample in metric["samples"])
+
+    lines = []
+    for name, metric in sorted(merged.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for sample in metric["samples"]:
+            labels = sample["labels"]
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_labels(labels)} {_number(sample['value'])}")
+                continue
+            for bound, count in zip(sample["buckets"], sample["counts"]):
+                lines.append(f"{name}_bucket{_labels({**labels, 'le': _number(float(bound))})} {count}")
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {sample['count']}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(float(sample['sum']))}")
+            lines.append(f"{name}_count{_labels(labels)} {sample['count']}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+import sys
+from datetime import datetime, time
+from functools import lru_cache
+
+CACHE_SIZE = 4096  # Distinct date/time strings remembered, a whole year of dates fits easily
+
+class NormalizeError(ValueError):
+    """
+    A date or time string that does not have the expected shape or is not a real date.
+    Subclasses ValueError so callers that caught strptime errors keep working.
+    """
+
+def _is_number(text):
+    return text.isascii() and text.isdigit()
+
+def _fields(text, separator, shape):
+    """
+    Splits text into three numeric fields. The fixed-width shape is sliced directly,
+    anything else (e.g. unpadded "5/4/2025", which strptime accepted too) is split.
+    """
+    if not isinstance(text, str):
+        raise NormalizeError(f"Expected {shape}, got {type(text).__name__}")
+    if len(shape) == len(text) and text[2] == separator and text[5] == separator:
+        first, second, third = text[0:2], text[3:5], text[6:]
+    else:
+        parts = text.split(separator)
+        if len(parts) != 3 or not 1 <= len(parts[0]) <= 2 or not 1 <= len(parts[1]) <= 2:
+            raise NormalizeError(f"Expected {shape}, got {text!r}")
+        first, second, third = parts
+    if not (_is_number(first) and _is_number(second) and _is_number(third)):
+        raise NormalizeError(f"Expected {shape}, got {text!r}")
+    return int(first), int(second), third
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_date(text, separator="-"):
+    """
+    Parses dd-mm-yyyy (or dd/mm/yyyy with separator="/") into a datetime at midnight.
+    """
+    shape = f"dd{separator}mm{separator}yyyy"
+    day, month, year = _fields(text, separator, shape)
+    if len(year) != 4:
+        raise NormalizeError(f"Expected {shape}, got {text!r}")
+    try:
+        return datetime(int(year), month, day)
+    except ValueError as e:
+        raise NormalizeError(f"Invalid date {text!r}: {e}") from None
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_short_date(text, separator="/"):
+    """
+    Parses dd/mm/yy into a datetime at midnight. Like strptime's %y,
+    69-99 are 1969-1999 and 00-68 are 2000-2068.
+    """
+    shape = f"dd{separator}mm{separator}yy"
+    day, month, year = _fields(text, separator, shape)
+    if len(year) != 2:
+        raise NormalizeError(f"Expected {shape}, got {text!r}")
+    year = int(year)
+    try:
+        return datetime(year + (1900 if year >= 69 else 2000), month, day)
+    except ValueError as e:
+        raise NormalizeError(f"Invalid date {text!r}: {e}") from None
+
+@lru_cache(maxsize=CACHE_SIZE)
+def parse_time(text):
+    """
+    Parses HH:MM:SS into a time.
+    """
+    hour, minute, second = _fields(text, ":", "HH:MM:SS")
+    if not 1 <= len(second) <= 2:
+        raise NormalizeError(f"Expected HH:MM:SS, got {text!r}")
+    try:
+        return time(hour, minute, int(second))
+    except ValueError as e:
+        raise NormalizeError(f"Invalid time {text!r}: {e}") from None
+
+def format_date(value):
+    """
+    dd-mm-yyyy, the date format of input.txt and final.txt.
+    """
+    return f"{value.day:02d}-{value.month:02d}-{value.year:04d}"
+
+def format_time(value):
+    return f"{value.hour:02d}:{value.minute:02d}:{value.second:02d}"
+
+def parse_event_line(line):
+    """
+    Splits an input.txt line into (event_type, slot, start_date, end_date, event_time).
+    Used by the compiler and by the schedule store, which must not import the compiler.
+    """
+    parts = line.strip().split(',')
+    event_type = int(parts[0])
+    
+    if event_type in (1, 2):  # Mid-semester or End-semester
+        slot = int(parts[1])
+        start_date = parse_date(parts[2])
+        
+        if len(parts) > 4:
+            end_date = parse_date(parts[3])
+            event_time = parse_time(parts[4])
+        elif len(parts) > 3:
+            try:
+                end_date = parse_date(parts[3])
+                event_time = None
+            except ValueError:
+                end_date = start_date
+                event_time = parse_time(parts[3])
+        else:
+            end_date = start_date
+            event_time = None
+        
+        return event_type, slot, start_date, end_date, event_time
+    
+    else:  # Holiday
+        start_date = parse_date(parts[1])
+        end_date = parse_date(parts[2]) if len(parts) > 2 else start_date
+        return event_type, None, start_date, end_date, None
+
+def benchmark(rounds=20000):
+    """
+    Compares strptime with the normalizer on a realistic mix: a few hundred distinct
+    dates and times, each seen many times. Cold runs clear the caches first.
+    """
+    import timeit
+    dates = [f"{day:02d}-{month:02d}-2025" for month in range(1, 13) for day in range(1, 29)]
+    times = [f"{hour:02d}:{minute:02d}:00" for hour in range(8, 17) for minute in range(0, 60, 5)]
+    samples = [(dates[i % len(dates)], times[i % len(times)]) for i in range(rounds)]
+
+    def with_strptime():
+        for date_str, time_str in samples:
+            datetime.strptime(date_str, "%d-%m-%Y")
+            datetime.strptime(time_str, "%H:%M:%S").time()
+
+    def with_normalize():
+        for date_str, time_str in samples:
+            parse_date(date_str)
+            parse_time(time_str)
+
+    def with_normalize_cold():
+        parse_date.cache_clear()
+        parse_time.cache_clear()
+        for date_str, time_str in set(samples):
+            parse_date(date_str)
+            parse_time(time_str)
+
+    def with_strptime_cold():
+        for date_str, time_str in set(samples):
+            datetime.strptime(date_str, "%d-%m-%Y")
+            datetime.strptime(time_str, "%H:%M:%S").time()
+
+    baseline = min(timeit.repeat(with_strptime, number=1, repeat=3))
+    fast = min(timeit.repeat(with_normalize, number=1, repeat=3))
+    baseline_cold = min(timeit.repeat(with_strptime_cold, number=1, repeat=3))
+    fast_cold = min(timeit.repeat(with_normalize_cold, number=1, repeat=3))
+    distinct = len(set(samples))
+    print(f"{rounds} lines ({len(dates)} dates, {len(times)} times):")
+    print(f"  strptime   {baseline * 1e6 / rounds:7.2f} us/line")
+    print(f"  normalize  {fast * 1e6 / rounds:7.2f} us/line  ({baseline / fast:.1f}x)")
+    print(f"{distinct} distinct lines, empty cache:")
+    print(f"  strptime   {baseline_cold * 1e6 / distinct:7.2f} us/line")
+    print(f"  normalize  {fast_cold * 1e6 / distinct:7.2f} us/line  ({baseline_cold / fast_cold:.1f}x)")
+
+if __name__ == "__main__":
+    # python3 normalize.py [rounds]
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -1,115 +1,299 @@
 #!/usr/bin/env python3
-import time
-import subprocess
+import logging
+import sys
 from datetime import datetime, timedelta
 import os
 import csv
-def main():
-    def parse_event_line(line):
-        parts = line.strip().split(',')
-        event_type = int(parts[0])
-        
-        if event_type in (1, 2):  # Mid-semester or End-semester
-            slot = int(parts[1])
-            start_date = datetime.strptime(parts[2], "%d-%m-%Y")
-            
-            if len(parts) > 4:
-                end_date = datetime.strptime(parts[3], "%d-%m-%Y")
-                event_time = datetime.strptime(parts[4], "%H:%M:%S").time()
-            elif len(parts) > 3:
+import io
+import pickle
+from watcher import watch, watch_file
+from schedule_store import open_store, DB_FILE
+from snapshot import atomic_write, write_snapshot
+from schedule_intervals import ScheduleCalendar
+from normalize import parse_event_line, format_date, format_time
+from event_log import locked
+from log_config import setup_logging
+import metrics
+import profiling
+from fire_table import pack_fire_table
+from timeline import TermTimeline
+
+input_file = "/home/pi/Desktop/server/input.txt"
+output_file = "/home/pi/Desktop/server/final.txt"
+csv_file = "/home/pi/Desktop/server/bell_events.csv"  # Saving in CSV instead of Excel
+fire_table_file = "/home/pi/Desktop/server/fire_table.bin"  # Sorted binary bell records mmap'd by bell.py
+manifest_file = "/home/pi/Desktop/server/snapshot.json"  # Generation + hash of each compiled output
+checkpoint_file = "/home/pi/Desktop/server/compile_state.pkl"  # Consumed offset of input.txt + compiled calendar
+
+CHECKPOINT_VERSION = 3  # Bump when the checkpointed state changes shape
+CHECKPOINT_TAIL_BYTES = 64  # Bytes before the offset kept to detect a rewritten input.txt
+COMPACT_RETENTION_DAYS = int(os.environ.get("BELL_RETENTION_DAYS", "30"))  # Entries that ended longer ago are dropped
+COMPACT_MIN_LINES = 50  # input.txt is compacted once it has this many lines and twice the lines it needs
+checkpoint = None  # In-memory copy of the checkpoint, loaded from disk on first use
+store = None  # SQLite schedule store, set when BELL_DB is configured
+logger = logging.getLogger("processing")
+
+STEP_SECONDS = metrics.histogram("processing_step_seconds", "Time spent in each compile step")
+COMPILE_SECONDS = metrics.histogram("processing_compile_seconds", "Time of a whole compile, from reading events to writing the snapshot")
+COMPILES = metrics.counter("processing_compiles_total", "Compiles run")
+GENERATION = metrics.gauge("processing_schedule_generation", "Generation of the last written snapshot")
+LOG_LINES = metrics.gauge("processing_input_lines", "Lines of input.txt replayed into the current calendar")
+
+def apply_event_line(calendar, line):
+    """
+    Applies a single input.txt line on top of the already compiled calendar.
+    Ranges are stored as intervals, they are never expanded into single days here.
+    """
+    event_type, slot, start_date, end_date, event_time = parse_event_line(line)
+    if event_type == 0:  # Holiday, masks all events on these dates
+        calendar.add_holiday(start_date, end_date)
+    else:
+        calendar.add_exam(slot, start_date, end_date, event_type, event_time)
+
+@STEP_SECONDS.labels(step="read_and_process_events").time()
+def read_and_process_events(input_file):
+    calendar = ScheduleCalendar()
+    try:
+        with open(input_file, 'r') as file:
+            for line in file:
                 try:
-                    end_date = datetime.strptime(parts[3], "%d-%m-%Y")
-                    event_time = None
-                except ValueError:
-                    end_date = start_date
-                    event_time = datetime.strptime(parts[3], "%H:%M:%S").time()
-            else:
-                end_date = start_date
-                event_time = None
-            
-            return event_type, slot, start_date, end_date, event_time
-        
-        else:  # Holiday
-            start_date = datetime.strptime(parts[1], "%d-%m-%Y")
-            end_date = datetime.strptime(parts[2], "%d-%m-%Y") if len(parts) > 2 else start_date
-            return event_type, None, start_date, end_date, None
-
-    def read_and_process_events(input_file):
-        event_dict = {}
-        try:
-            with open(input_file, 'r') as file:
-                for line in file:
-                    try:
-                        event_type, slot, start_date, end_date, event_time = parse_event_line(line)
-                        for single_date in (start_date + timedelta(n) for n in range((end_date - start_date).days + 1)):
-                            if event_type == 0:  # Holiday, override all events on this date
-                                event_dict[single_date] = {None: (event_type, None)}
-                            else:
-                                # If the date already has a holiday, skip adding other events
-                                if single_date not in event_dict or None not in event_dict[single_date]:
-                                    if single_date not in event_dict:
-                                        event_dict[single_date] = {}
-                                    event_dict[single_date][slot] = (event_type, event_time)
-                    except Exception as e:
-                        print(f"Error parsing line '{line}': {e}")
-        except Exception as e:
-            print(f"Error reading file {input_file}: {e}")
+                    apply_event_line(calendar, line)
+                except Exception as e:
+                    logger.warning(f"Error parsing line '{line}': {e}")
+    except Exception as e:
+        logger.error(f"Error reading file {input_file}: {e}")
+
+    return calendar
+
+def load_checkpoint(path):
+    """
+    Loads the saved compile state. Returns None if there is none or it is unreadable.
+    """
+    try:
+        with open(path, 'rb') as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Ignoring unreadable checkpoint {path}: {e}")
+        return None
+
+def save_checkpoint(path, checkpoint):
+    atomic_write(path, pickle.dumps(checkpoint, protocol=pickle.HIGHEST_PROTOCOL))
+
+def checkpoint_matches(checkpoint, file, st):
+    """
+    Checks that input.txt is still the file the checkpoint was taken from:
+    same inode, not shorter than what we consumed, and the same bytes right before the offset.
+    """
+    if not checkpoint or checkpoint.get("version") != CHECKPOINT_VERSION or checkpoint.get("source", "file") != "file":
+        return False
+    if checkpoint["inode"] != st.st_ino or st.st_size < checkpoint["offset"]:
+        return False
+    tail = checkpoint["tail"]
+    file.seek(checkpoint["offset"] - len(tail))
+    return file.read(len(tail)) == tail
 
-        return event_dict
+@STEP_SECONDS.labels(step="update_events").time()
+def update_events(input_file, checkpoint_file):
+    """
+    Brings the compiled events up to date by parsing only the lines appended to
+    input.txt since the last checkpoint. Falls back to a full replay when the file
+    was truncated or replaced, for example by CLEAR_FILES.py.
+    """
+    global checkpoint
+    if checkpoint is None:
+        checkpoint = load_checkpoint(checkpoint_file)
 
-    def write_latest_events(event_dict, output_file):
+    try:
+        with open(input_file, 'rb') as file:
+            st = os.fstat(file.fileno())
+            if not checkpoint_matches(checkpoint, file, st):
+                logger.info(f"Replaying {input_file} from the beginning")
+                checkpoint = {"version": CHECKPOINT_VERSION, "source": "file", "inode": st.st_ino, "offset": 0, "tail": b"", "lines": 0, "calendar": ScheduleCalendar()}
+            file.seek(checkpoint["offset"])
+            data = file.read()
+    except Exception as e:
+        logger.error(f"Error reading file {input_file}: {e}")
+        return checkpoint["calendar"] if checkpoint else ScheduleCalendar()
+
+    # Only consume complete lines, a line that is still being written is picked up next time
+    end = data.rfind(b"\n") + 1
+    calendar = checkpoint["calendar"]
+    for raw_line in data[:end].splitlines():
+        line = raw_line.decode('utf-8', errors='replace')
+        checkpoint["lines"] += 1
         try:
-            with open(output_file, 'w') as file:
-                for date in sorted(event_dict.keys()):
-                    events = event_dict[date]
-                    if None in events:
-                        event_type, _ = events[None]
-                        file.write(f"{event_type},{date.strftime('%d-%m-%Y')}\n")
-                    else:
-                        for slot, (event_type, event_time) in sorted(events.items()):
-                            if event_type in (1, 2):
-                                file.write(f"{event_type},{slot},{date.strftime('%d-%m-%Y')},{event_time.strftime('%H:%M:%S') if event_time else ''}\n")
+            apply_event_line(calendar, line)
         except Exception as e:
-            print(f"Error writing to file {output_file}: {e}")
+            logger.warning(f"Error parsing line '{line}': {e}")
+
+    checkpoint["offset"] += end
+    checkpoint["tail"] = (checkpoint["tail"] + data[:end])[-CHECKPOINT_TAIL_BYTES:]
+    try:
+        save_checkpoint(checkpoint_file, checkpoint)
+    except Exception as e:
+        logger.error(f"Error writing checkpoint {checkpoint_file}: {e}")
+    return calendar
+
+@STEP_SECONDS.labels(step="render_latest_events").time()
+def render_latest_events(calendar):
+    """
+    Renders the effective schedule as ranges: "0,start[,end]" for holidays and
+    "type,slot,start[,end],time" for exam slots, with holiday days already cut out.
+    """
+    lines = []
+    for start, end in calendar.holiday_ranges():
+        if start == end:
+            lines.append((start, f"0,{start.strftime('%d-%m-%Y')}\n"))
+        else:
+            lines.append((start, f"0,{start.strftime('%d-%m-%Y')},{end.strftime('%d-%m-%Y')}\n"))
+    for start, end, slot, (event_type, event_time) in calendar.exam_ranges():
+        if event_type not in (1, 2):
+            continue
+        time_str = event_time.strftime('%H:%M:%S') if event_time else ''
+        if start == end:
+            lines.append((start, f"{event_type},{slot},{start.strftime('%d-%m-%Y')},{time_str}\n"))
+        else:
+            lines.append((start, f"{event_type},{slot},{start.strftime('%d-%m-%Y')},{end.strftime('%d-%m-%Y')},{time_str}\n"))
+    lines.sort(key=lambda item: item[0])
+    return "".join(line for _, line in lines)
+
+def write_latest_events(calendar, output_file):
+    try:
+        atomic_write(output_file, render_latest_events(calendar))
+    except Exception as e:
+        logger.error(f"Error writing to file {output_file}: {e}")
+
+@STEP_SECONDS.labels(step="render_csv").time()
+def render_csv(calendar):
+    file = io.StringIO(newline='')
+    csv_writer = csv.writer(file)
+    csv_writer.writerow(["Type", "Date", "Timings"])  # CSV header
+    # All exam days x slots x offsets are computed in one batch, with the same offsets the scheduler uses
+    csv_writer.writerows(TermTimeline(calendar).csv_rows())
+    return file.getvalue()
+
+def write_to_csv(calendar, csv_file):
+    try:
+        atomic_write(csv_file, render_csv(calendar))
+    except Exception as e:
+        logger.error(f"Error writing to CSV file {csv_file}: {e}")
 
-    def calculate_bell_times(base_time, offsets):
-        return [base_time + offset for offset in offsets]
+def render_event_log(calendar, keep_from):
+    """
+    Renders the smallest input.txt that replays into the same schedule from keep_from on:
+    one line per holiday range and per exam range (holidays already cut out), skipping
+    ranges that ended before keep_from and exam types that ring nothing.
+    """
+    lines = []
+    for start, end in calendar.holiday_ranges():
+        if end >= keep_from:
+            lines.append((start, 0, f"0,{format_date(start)},{format_date(end)}\n"))
+    for start, end, slot, (event_type, event_time) in calendar.exam_ranges():
+        if end >= keep_from and event_type in (1, 2):
+            time_field = f",{format_time(event_time)}" if event_time else ""
+            lines.append((start, slot, f"{event_type},{slot},{format_date(start)},{format_date(end)}{time_field}\n"))
+    lines.sort(key=lambda item: item[:2])
+    return "".join(line for _, _, line in lines)
 
-    def write_to_csv(event_dict, csv_file):
+@STEP_SECONDS.labels(step="compact_events").time()
+def compact_events(input_file, checkpoint_file, force=False):
+    """
+    Rewrites input.txt atomically with only the entries that still affect the schedule,
+    once it holds more than twice the lines it needs (or always with force).
+    Holds the append lock so no submission from app.py can slip in between.
+    """
+    with locked(input_file):
+        calendar = update_events(input_file, checkpoint_file)  # Everything appended so far
+        keep_from = datetime.now().date() - timedelta(days=COMPACT_RETENTION_DAYS)
+        text = render_event_log(calendar, keep_from)
+        needed = text.count("\n")
+        if not force and (checkpoint["lines"] < COMPACT_MIN_LINES or checkpoint["lines"] <= 2 * needed):
+            return calendar
+        atomic_write(input_file, text)
+        logger.info(f"Compacted {input_file} from {checkpoint['lines']} to {needed} lines")
+        return update_events(input_file, checkpoint_file)  # New inode, replays the compacted file
+
+@STEP_SECONDS.labels(step="update_events_from_store").time()
+def update_events_from_store(store, checkpoint_file):
+    """
+    Same as update_events, but reads the events added to the SQLite store since the
+    last checkpoint (by row id) instead of the tail of input.txt.
+    """
+    global checkpoint
+    if checkpoint is None:
+        checkpoint = load_checkpoint(checkpoint_file)
+
+    last_id = store.last_event_id()
+    if (not checkpoint or checkpoint.get("version") != CHECKPOINT_VERSION
+            or checkpoint.get("source") != "store" or last_id < checkpoint["last_id"]):
+        logger.info(f"Replaying events from {store.path}")
+        checkpoint = {"version": CHECKPOINT_VERSION, "source": "store", "last_id": 0, "calendar": ScheduleCalendar()}
+
+    calendar = checkpoint["calendar"]
+    for event_id, line in store.events_since(checkpoint["last_id"]):
         try:
-            with open(csv_file, 'w', newline='') as file:
-                csv_writer = csv.writer(file)
-                csv_writer.writerow(["Type", "Date", "Timings"])  # CSV header
-
-                mid_offsets = [timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=2, minutes=5), timedelta(hours=2, minutes=15)]
-                end_offsets = [timedelta(minutes=5), timedelta(minutes=15), timedelta(hours=3, minutes=5), timedelta(hours=3, minutes=15)]
-
-                for date, events in sorted(event_dict.items()):
-                    date_str = date.strftime('%d-%m-%Y')
-                    if None in events:
-                        csv_writer.writerow(["Holiday", date_str, "No bell ringing"])
-                    else:
-                        for slot, (event_type, event_time) in events.items():
-                            if event_time:
-                                base_time = datetime.combine(date, event_time)
-                                if event_type == 1:
-                                    all_timings = [base_time.strftime('%H:%M:%S')] + [t.strftime('%H:%M:%S') for t in calculate_bell_times(base_time, mid_offsets)]
-                                    csv_writer.writerow([ "Midsem", date_str, ", ".join(all_timings)])
-                                elif event_type == 2:
-                                    all_timings = [base_time.strftime('%H:%M:%S')] + [t.strftime('%H:%M:%S') for t in calculate_bell_times(base_time, end_offsets)]
-                                    csv_writer.writerow([ "Endsem", date_str, ", ".join(all_timings)])
+            apply_event_line(calendar, line)
         except Exception as e:
-            print(f"Error writing to CSV file {csv_file}: {e}")
+            logger.warning(f"Error parsing line '{line}': {e}")
+        checkpoint["last_id"] = event_id
 
+    try:
+        save_checkpoint(checkpoint_file, checkpoint)
+    except Exception as e:
+        logger.error(f"Error writing checkpoint {checkpoint_file}: {e}")
+    return calendar
+
+@STEP_SECONDS.labels(step="fire_table").time()
+def build_fire_table(calendar):
+    return pack_fire_table(calendar, datetime.now().date())
+
+@COMPILE_SECONDS.time()
+def main():
+    if store is not None:
+        calendar = update_events_from_store(store, checkpoint_file)
+    else:
+        calendar = compact_events(input_file, checkpoint_file)
+        LOG_LINES.set(checkpoint["lines"])
 
-    input_file = "/home/pi/Desktop/server/input.txt"
-    output_file = "/home/pi/Desktop/server/final.txt"
-    csv_file = "/home/pi/Desktop/server/bell_events.csv"  # Saving in CSV instead of Excel
+    # Each output is replaced atomically and only if its content changed; readers watch the generation
+    try:
+        outputs = {
+            output_file: render_latest_events(calendar),
+            csv_file: render_csv(calendar),  # Writing the event data to CSV
+            fire_table_file: build_fire_table(calendar),
+        }
+        with STEP_SECONDS.labels(step="write_snapshot").time():
+            generation, changed = write_snapshot(manifest_file, outputs)
+    except Exception as e:
+        logger.error(f"Error writing snapshot: {e}")
+        return
+    COMPILES.inc()
+    GENERATION.set(generation)
+    if changed:
+        logger.info(f"Wrote schedule generation {generation}")
+    # The scheduler reads today's ranges from the store. It can lag an unchanged snapshot too,
+    # e.g. right after "schedule_store.py migrate" into a new database, so compare generations.
+    if store is not None and (changed or store.compiled_snapshot() != generation):
+        store.replace_compiled(calendar, generation)
 
-    event_dict = read_and_process_events(input_file)
-    write_latest_events(event_dict, output_file)
-    write_to_csv(event_dict, csv_file)  # Writing the event data to CSV
 if __name__ == "__main__":
-    while True:
-        time.sleep(2)  # Wait for 5 seconds
-        main()  # Call the main function
+    setup_logging("processing")
+    metrics.start_publisher("processing")
+    profiling.install("processing")
+    store = open_store()
+    if "--compact" in sys.argv and store is None:
+        # One-off: python3 processing.py --compact
+        compact_events(input_file, checkpoint_file, force=True)
+        sys.exit(0)
+    on_ready = None
+    if "--startup-report" in sys.argv:
+        import startup_report
+        on_ready = lambda: startup_report.report_ready("processing")  # After the watcher's first compile
+    if store is not None:
+        # New events are a new max(id), checking it is a cheap indexed read
+        watch(store.last_event_id, main, DB_FILE, on_ready=on_ready)
+    else:
+        # Recompile only when input.txt actually changes instead of every 2 seconds
+        watch_file(input_file, main, on_ready=on_ready)
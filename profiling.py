@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+import collections
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from log_config import LOG_DIR
+
+PROFILE_DIR = os.environ.get("BELL_PROFILE_DIR", os.path.join(LOG_DIR, "profiles"))
+PROFILE_ON_START = os.environ.get("BELL_PROFILE", "").lower()  # "cpu", "memory" or "all" to profile from startup
+SAMPLE_INTERVAL = 0.01  # Seconds between stack samples, about 1% of a Pi core
+TRACEMALLOC_FRAMES = 10  # Frames kept per allocation traceback
+TOP_ALLOCATIONS = 40  # Lines listed in a memory report
+logger = logging.getLogger("profiling")
+
+class SamplingProfiler:
+    """
+    Wall-clock profiler that samples the stacks of every other thread SAMPLE_INTERVAL apart.
+    The result is in the collapsed-stack format ("thread;outer;...;inner count") that
+    flamegraph.pl and speedscope read. Nothing is hooked into the profiled code, so it can
+    be turned on and off in a running process.
+    """
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self.started = None
+        self.running = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.started = time.time()
+        self.running.set()
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.running.clear()
+        self.thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        while self.running.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+            time.sleep(self.interval)
+
+    def write(self, path):
+        with open(path, 'w') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f"{stack} {count}\n")
+
+_lock = threading.Lock()
+_name = "process"
+_profiler = None  # Running SamplingProfiler, if any
+_last_memory = None  # Previous tracemalloc snapshot, later reports show the growth since it
+
+def _output_path(suffix):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    return os.path.join(PROFILE_DIR, f"{_name}-{time.strftime('%Y%m%d-%H%M%S')}.{suffix}")
+
+def start_profile(seconds=None):
+    """
+    Starts the sampling profiler. With seconds, it stops and writes its output by itself.
+    Returns False if it was already running.
+    """
+    global _profiler
+    with _lock:
+        if _profiler is not None:
+            return False
+        _profiler = SamplingProfiler()
+        _profiler.start()
+    logger.info("Sampling profiler started")
+    if seconds:
+        timer = threading.Timer(seconds, stop_profile)
+        timer.daemon = True
+        timer.start()
+    return True
+
+def stop_profile():
+    """
+    Stops the sampling profiler and writes the collapsed stacks.
+    Returns the path written, or None if it was not running.
+    """
+    global _profiler
+    with _lock:
+        profiler, _profiler = _profiler, None
+    if profiler is None:
+        return None
+    profiler.stop()
+    path = _output_path("collapsed")
+    profiler.write(path)
+    logger.info(f"Wrote {profiler.samples} stack samples over {time.time() - profiler.started:.1f}s to {path}")
+    return path
+
+def profile_status():
+    with _lock:
+        profiler = _profiler
+    return {
+        "cpu": None if profiler is None else {"since": profiler.started, "samples": profiler.samples},
+        "memory": tracemalloc.is_tracing(),
+        "directory": PROFILE_DIR,
+    }
+
+def memory_snapshot():
+    """
+    Writes the top allocation sites, and their growth since the previous report, to a file.
+    The first call only starts tracemalloc (allocations made before it are not seen) and returns None.
+    """
+    global _last_memory
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        logger.info("tracemalloc started, the next snapshot reports allocations from now on")
+        return None
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    current, peak = tracemalloc.get_traced_memory()
+    path = _output_path("memory.txt")
+    with open(path, 'w') as file:
+        file.write(f"Traced memory: {current / 1024:.1f} KiB now, {peak / 1024:.1f} KiB peak\n\n")
+        file.write("Top allocation sites:\n")
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            file.write(f"{stat}\n")
+        if _last_memory is not None:
+            file.write("\nGrowth since the previous report:\n")
+            for stat in snapshot.compare_to(_last_memory, "lineno")[:TOP_ALLOCATIONS]:
+                file.write(f"{stat}\n")
+    _last_memory = snapshot
+    logger.info(f"Wrote memory report to {path}")
+    return path
+
+def _toggle_profile():
+    if not start_profile():
+        stop_profile()
+
+def _in_background(function):
+    # Signal handlers run on the main thread between bytecodes, possibly inside the bell loop:
+    # hand the work to a thread so the handler returns at once
+    return lambda signum, frame: threading.Thread(target=function, daemon=True).start()
+
+def install(name):
+    """
+    Names this process's profile files and wires up the triggers:
+    SIGUSR1 starts the sampling profiler, the next SIGUSR1 stops it and writes the stacks;
+    SIGUSR2 starts tracemalloc, each later SIGUSR2 writes a memory report.
+    BELL_PROFILE=cpu|memory|all turns them on from startup.
+    """
+    global _name
+    _name = name
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, _in_background(_toggle_profile))
+        signal.signal(signal.SIGUSR2, _in_background(memory_snapshot))
+    if PROFILE_ON_START in ("memory", "all"):
+        memory_snapshot()
+    if PROFILE_ON_START in ("cpu", "all"):
+        start_profile()
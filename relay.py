@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+import ipc
+import hardware
+import metrics
+
+RELAY_PIN = 4  # BCM pin driving the bell relay
+SOCKET_PATH = os.environ.get("BELL_RELAY_SOCKET", "/tmp/cu-bell-relay.sock")
+MAX_PULSE = 30  # Seconds, no request or run of merged requests can keep the bell on longer than this
+TICKET_HISTORY = 200  # How many finished tickets are kept for status queries
+logger = logging.getLogger("relay")
+
+RINGS_DROPPED = metrics.counter("relay_rings_dropped_total", "Rings dropped because the relay daemon was not running")
+
+class RelayActuator:
+    """
+    The only thing that touches the relay pin. ring() records the request and returns at once
+    with a ticket; a single worker thread drives the pin. A request that arrives while a pulse
+    is pending or ringing joins that pulse instead of ringing again, which ring() decides under
+    the lock, so the ticket it returns already says whether it was coalesced. Joining extends
+    the pulse, but never past MAX_PULSE after it started, so a stream of clicks cannot keep
+    the bell on.
+    """
+    def __init__(self, gpio):
+        self.gpio = gpio
+        self.gpio.setmode(gpio.BCM)
+        self.gpio.setup(RELAY_PIN, gpio.OUT)
+        self.gpio.output(RELAY_PIN, gpio.LOW)
+        self.tickets = OrderedDict()
+        self.pulse = None  # {"id", "members", "started_at", "limit", "end"} while a pulse is pending or ringing
+        self.lock = threading.Condition()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def ring(self, duration, source=""):
+        ticket = {
+            "ticket": uuid.uuid4().hex[:12],
+            "status": "queued",
+            "source": source,
+            "duration": min(max(float(duration), 0), MAX_PULSE),
+            "requested_at": time.time(),
+            "pulse": None,
+            "coalesced": False,
+            "started_at": None,
+            "finished_at": None,
+        }
+        with self.lock:
+            self.tickets[ticket["ticket"]] = ticket
+            while len(self.tickets) > TICKET_HISTORY:
+                self.tickets.popitem(last=False)
+            pulse = self.pulse
+            if pulse is None:
+                self.pulse = {"id": ticket["ticket"], "members": [ticket], "started_at": None, "limit": None, "end": None}
+            else:
+                ticket["coalesced"] = True
+                ticket["pulse"] = pulse["id"]
+                pulse["members"].append(ticket)
+                if pulse["end"] is not None:  # Already ringing
+                    ticket["status"] = "ringing"
+                    ticket["started_at"] = pulse["started_at"]
+                    pulse["end"] = min(max(pulse["end"], time.monotonic() + ticket["duration"]), pulse["limit"])
+            self.lock.notify()
+            return dict(ticket)
+
+    def status(self, ticket_id):
+        with self.lock:
+            ticket = self.tickets.get(ticket_id)
+            return dict(ticket) if ticket else None
+
+    def _run(self):
+        with self.lock:
+            while True:
+                while self.pulse is None:
+                    self.lock.wait()  # Blocks while the bell is idle
+                pulse = self.pulse
+                now = time.monotonic()
+                pulse["started_at"] = time.time()
+                pulse["limit"] = now + MAX_PULSE
+                pulse["end"] = now + max(ticket["duration"] for ticket in pulse["members"])
+                self.gpio.output(RELAY_PIN, self.gpio.HIGH)
+                self._update(pulse)
+
+                # ring() merges everything that arrives meanwhile into this pulse and moves its end
+                remaining = pulse["end"] - time.monotonic()
+                while remaining > 0:
+                    self.lock.wait(remaining)
+                    remaining = pulse["end"] - time.monotonic()
+
+                self.gpio.output(RELAY_PIN, self.gpio.LOW)
+                self.pulse = None
+                self._update(pulse, finished_at=time.time())
+
+    def _update(self, pulse, finished_at=None):
+        """
+        Copies the pulse's state to its tickets. Called with self.lock held.
+        """
+        for ticket in pulse["members"]:
+            ticket["pulse"] = pulse["id"]
+            ticket["started_at"] = pulse["started_at"]
+            ticket["finished_at"] = finished_at
+            ticket["status"] = "done" if finished_at else "ringing"
+
+    def handle_message(self, message):
+        if message.get("op") == "ring":
+            return self.ring(message.get("duration", 3), message.get("source", ""))
+        if message.get("op") == "status":
+            return self.status(message.get("ticket")) or {"status": "error", "message": "Unknown ticket"}
+        return {"status": "error", "message": f"Unknown op {message.get('op')}"}
+
+def ring_bell(duration, source=""):
+    """
+    Asks the relay daemon to ring the bell for duration seconds. Returns the ticket immediately.
+    Only the daemon drives the pin: if it is not running the ring is dropped, logged and
+    counted rather than rung from this process, where it would be neither merged with nor
+    capped against the rings of other processes. Raises OSError in that case, and when the
+    daemon took the request but did not reply in time (it may well be ringing then).
+    """
+    try:
+        return ipc.request(SOCKET_PATH, {"op": "ring", "duration": duration, "source": source})
+    except (FileNotFoundError, ConnectionRefusedError) as e:
+        logger.error(f"Relay daemon not running ({e}), {source or 'unnamed'} ring dropped")
+        RINGS_DROPPED.inc()
+        raise
+
+def relay_status(ticket_id):
+    return ipc.request(SOCKET_PATH, {"op": "status", "ticket": ticket_id})
+
+if __name__ == "__main__":
+    from log_config import setup_logging
+    setup_logging("relay")
+    actuator = RelayActuator(hardware.relay_gpio())  # BELL_HARDWARE=sim records the pulses instead
+    ipc.serve(SOCKET_PATH, actuator.handle_message)
+    logger.info(f"Relay actuator listening on {SOCKET_PATH}")
+    if "--startup-report" in sys.argv:
+        import startup_report
+        startup_report.report_ready("relay")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        actuator.gpio.output(RELAY_PIN, actuator.gpio.LOW)
+        actuator.gpio.cleanup()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Replays a whole term through the scheduler loop on a virtual clock and checks every relay pulse.
+
+    python3 replay.py [input.txt] [--from dd-mm-yyyy] [--to dd-mm-yyyy] [--pulses pulses.csv]
+
+The calendar is compiled into a fire table like processing.py does, bell.main_loop runs on a
+VirtualClock with a simulated relay, and the recorded rings are compared with the bells the
+timeline says should ring. Exits 1 if any bell is missing, extra or late.
+"""
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ.pop("BELL_DB", None)  # Always replay from the text calendar, never the live database
+import bell
+import hardware
+from fire_table import pack_fire_table
+from normalize import parse_date
+from processing import read_and_process_events
+from timeline import TermTimeline, to_epoch
+
+REPLAY_CHECK_INTERVAL = 3600  # Nothing edits the schedule during a replay, so the loop only wakes for bells and midnight
+
+def calendar_extent(calendar):
+    days = [day for start, end in calendar.holiday_ranges() for day in (start, end)]
+    days += [day for start, end, _, _ in calendar.exam_ranges() for day in (start, end)]
+    return (min(days), max(days)) if days else (None, None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Replays a term through the scheduler on a virtual clock")
+    parser.add_argument("input", nargs="?", default="input.txt")
+    parser.add_argument("--from", dest="first", help="first day (dd-mm-yyyy), the calendar's first day by default")
+    parser.add_argument("--to", dest="last", help="last day (dd-mm-yyyy), the calendar's last day by default")
+    parser.add_argument("--pulses", help="write every recorded ring to this CSV file")
+    args = parser.parse_args()
+
+    calendar = read_and_process_events(args.input)
+    first, last = calendar_extent(calendar)
+    first = parse_date(args.first).date() if args.first else first
+    last = parse_date(args.last).date() if args.last else last
+    if first is None or last is None or last < first:
+        sys.exit("Nothing to replay: give --from and --to or a calendar with events")
+    days = (last - first).days + 1
+
+    start = datetime.combine(first, datetime.min.time()).timestamp()
+    end = datetime.combine(last + timedelta(days=1), datetime.min.time()).timestamp()
+    clock = hardware.VirtualClock(start)
+    relay = hardware.SimRelay(clock)
+
+    with tempfile.TemporaryDirectory(prefix="bell-replay-") as workdir:
+        bell.fire_table_file = os.path.join(workdir, "fire_table.bin")
+        bell.manifest_file = os.path.join(workdir, "snapshot.json")
+        bell.final_file = os.path.join(workdir, "final.txt")
+        with open(bell.fire_table_file, 'wb') as file:
+            file.write(pack_fire_table(calendar, first, days))
+        bell.clock = clock
+        bell.relay_client = relay
+        bell.CHANGE_CHECK_INTERVAL = REPLAY_CHECK_INTERVAL
+        started = time.perf_counter()
+        bell.main_loop(until=end)
+        elapsed = time.perf_counter() - started
+
+    times, _, _ = TermTimeline(calendar, first, last).fire_schedule()
+    expected = set(to_epoch(times).tolist())
+    rung = [int(epoch) for epoch, _, _ in relay.rings]
+    missing = sorted(expected - set(rung))
+    extra = sorted(set(rung) - expected)
+    latest = max((epoch - int(epoch) for epoch, _, _ in relay.rings), default=0)
+
+    if args.pulses:
+        with open(args.pulses, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(["Time", "Duration", "Source"])
+            for epoch, duration, source in relay.rings:
+                writer.writerow([datetime.fromtimestamp(epoch).strftime('%d-%m-%Y %H:%M:%S'), duration, source])
+
+    print(f"Replayed {days} days ({first.strftime('%d-%m-%Y')} to {last.strftime('%d-%m-%Y')}) in {elapsed:.2f}s, "
+          f"{days / elapsed:.0f} days/s")
+    print(f"{len(rung)} bells rung, {len(expected)} expected, {len(missing)} missing, {len(extra)} extra, "
+          f"{len(rung) - len(set(rung))} repeated, latest {latest:.3f}s after its second")
+    for label, epochs in (("Missing", missing), ("Extra", extra)):
+        for epoch in epochs[:10]:
+            print(f"  {label}: {datetime.fromtimestamp(epoch).strftime('%d-%m-%Y %H:%M:%S')}")
+    if missing or extra or len(rung) != len(set(rung)) or latest >= 1:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
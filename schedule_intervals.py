@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+from bisect import bisect_right
+from datetime import date, datetime, timedelta
+
+ONE_DAY = timedelta(days=1)
+
+def as_day(value):
+    """
+    Accepts a date or datetime and returns the calendar day as a date.
+    """
+    return value.date() if isinstance(value, datetime) else value
+
+class IntervalSet:
+    """
+    Sorted, non-overlapping day ranges (inclusive on both ends).
+    Overlapping or touching ranges are merged when added.
+    """
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def add(self, start, end):
+        i = bisect_right(self.starts, start) - 1
+        if i < 0 or self.ends[i] + ONE_DAY < start:
+            i += 1
+        j = i
+        while j < len(self.starts) and self.starts[j] <= end + ONE_DAY:
+            start = min(start, self.starts[j])
+            end = max(end, self.ends[j])
+            j += 1
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def contains(self, day):
+        i = bisect_right(self.starts, day) - 1
+        return i >= 0 and self.ends[i] >= day
+
+    def ranges(self):
+        return list(zip(self.starts, self.ends))
+
+class IntervalMap:
+    """
+    Sorted, non-overlapping day ranges each carrying a value.
+    Assigning a range overwrites whatever was there before for those days,
+    which is the "latest line wins" rule of input.txt.
+    """
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.values = []
+
+    def assign(self, start, end, value):
+        i = bisect_right(self.starts, start) - 1
+        if i < 0 or self.ends[i] < start:
+            i += 1
+        j = i
+        pieces = [(start, end, value)]
+        while j < len(self.starts) and self.starts[j] <= end:
+            old_start, old_end, old_value = self.starts[j], self.ends[j], self.values[j]
+            if old_start < start:  # Keep the part before the new range
+                pieces.insert(0, (old_start, start - ONE_DAY, old_value))
+            if old_end > end:  # Keep the part after the new range
+                pieces.append((end + ONE_DAY, old_end, old_value))
+            j += 1
+        self.starts[i:j] = [p[0] for p in pieces]
+        self.ends[i:j] = [p[1] for p in pieces]
+        self.values[i:j] = [p[2] for p in pieces]
+        self._merge_neighbours(i, i + len(pieces))
+
+    def _merge_neighbours(self, first, last):
+        """
+        Joins touching ranges with equal values, from index first-1 up to index last.
+        """
+        for k in range(min(last, len(self.starts) - 1), max(first, 1) - 1, -1):
+            if self.values[k - 1] == self.values[k] and self.ends[k - 1] + ONE_DAY == self.starts[k]:
+                self.ends[k - 1] = self.ends[k]
+                del self.starts[k], self.ends[k], self.values[k]
+
+    def get(self, day):
+        i = bisect_right(self.starts, day) - 1
+        if i >= 0 and self.ends[i] >= day:
+            return self.values[i]
+        return None
+
+    def ranges(self):
+        return list(zip(self.starts, self.ends, self.values))
+
+class ScheduleCalendar:
+    """
+    Compiled holidays and exam slots kept as day ranges instead of one entry per day.
+    A holiday masks every exam slot on its days, no matter in which order they were added.
+    """
+    def __init__(self):
+        self.holidays = IntervalSet()
+        self.slots = {}  # slot -> IntervalMap of (event_type, event_time)
+
+    def add_holiday(self, start_date, end_date):
+        self.holidays.add(as_day(start_date), as_day(end_date))
+
+    def add_exam(self, slot, start_date, end_date, event_type, event_time):
+        if slot not in self.slots:
+            self.slots[slot] = IntervalMap()
+        self.slots[slot].assign(as_day(start_date), as_day(end_date), (event_type, event_time))
+
+    def is_holiday(self, day):
+        return self.holidays.contains(as_day(day))
+
+    def events_on(self, day):
+        """
+        Returns what applies on a day in the old per-day shape:
+        {None: (0, None)} for a holiday, {slot: (event_type, event_time)} for exams,
+        or an empty dict for a normal day.
+        """
+        day = as_day(day)
+        if self.holidays.contains(day):
+            return {None: (0, None)}
+        events = {}
+        for slot in sorted(self.slots):
+            value = self.slots[slot].get(day)
+            if value is not None:
+                events[slot] = value
+        return events
+
+    def holiday_ranges(self):
+        return self.holidays.ranges()
+
+    def exam_ranges(self):
+        """
+        Returns (start, end, slot, (event_type, event_time)) for every exam range
+        with the holiday days cut out, sorted by start date and slot.
+        """
+        pieces = []
+        for slot, interval_map in self.slots.items():
+            for start, end, value in interval_map.ranges():
+                for piece_start, piece_end in self._without_holidays(start, end):
+                    pieces.append((piece_start, piece_end, slot, value))
+        pieces.sort(key=lambda piece: (piece[0], piece[2]))
+        return pieces
+
+    def _without_holidays(self, start, end):
+        starts, ends = self.holidays.starts, self.holidays.ends
+        i = bisect_right(starts, start) - 1
+        if i < 0 or ends[i] < start:
+            i += 1
+        while i < len(starts) and starts[i] <= end:
+            if starts[i] > start:
+                yield start, starts[i] - ONE_DAY
+            start = ends[i] + ONE_DAY
+            i += 1
+        if start <= end:
+            yield start, end
+
+    def expand(self, start=None, end=None):
+        """
+        Lazily yields (day, events) for every day between start and end (inclusive)
+        that has a holiday or an exam, in date order. Days without anything are skipped
+        without being visited, so a long quiet gap costs nothing.
+        """
+        covered = IntervalSet()
+        for range_start, range_end in self.holidays.ranges():
+            covered.add(range_start, range_end)
+        for interval_map in self.slots.values():
+            for range_start, range_end, _ in interval_map.ranges():
+                covered.add(range_start, range_end)
+
+        start = as_day(start) if start is not None else date.min
+        end = as_day(end) if end is not None else date.max
+        for range_start, range_end in covered.ranges():
+            day = max(range_start, start)
+            last = min(range_end, end)
+            while day <= last:
+                events = self.events_on(day)
+                if events:
+                    yield day, events
+                day += ONE_DAY
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+import os
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date
+from schedule_intervals import ScheduleCalendar
+from normalize import parse_date, parse_event_line
+
+DB_FILE = os.environ.get("BELL_DB")  # e.g. /home/pi/Desktop/server/bell.db, text files are used when unset
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    line TEXT NOT NULL,      -- the event exactly as it would appear in input.txt
+    event_type INTEGER,      -- NULL when the line could not be parsed
+    slot INTEGER,
+    start_date TEXT,         -- ISO yyyy-mm-dd, so ranges compare correctly as text
+    end_date TEXT,
+    event_time TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_dates ON events (start_date, end_date);
+CREATE INDEX IF NOT EXISTS events_type ON events (event_type, start_date);
+
+CREATE TABLE IF NOT EXISTS compiled (
+    event_type INTEGER NOT NULL,
+    slot INTEGER,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    event_time TEXT
+);
+CREATE INDEX IF NOT EXISTS compiled_dates ON compiled (start_date, end_date);
+CREATE INDEX IF NOT EXISTS compiled_type ON compiled (event_type, start_date);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+class ScheduleStore:
+    """
+    SQLite schedule store in WAL mode shared by the API, the compiler and the scheduler.
+    Readers never block each other or the writer; writes go through one connection per
+    thread and SQLite's busy timeout serialises writers across processes.
+    The API appends to events, the compiler replaces compiled, the scheduler reads compiled.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.connection.executescript(SCHEMA)
+
+    @property
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL, far fewer fsyncs on the SD card
+            self.local.conn = conn
+        return conn
+
+    def add_events(self, lines):
+        """
+        Appends input.txt style lines in one transaction and returns how many were stored.
+        Lines that do not parse are kept (like input.txt does) but are skipped by the compiler.
+        """
+        rows = []
+        for line in lines:
+            line = line.strip()
+            try:
+                event_type, slot, start_date, end_date, event_time = parse_event_line(line)
+                rows.append((line, event_type, slot, start_date.date().isoformat(), end_date.date().isoformat(),
+                             event_time.strftime("%H:%M:%S") if event_time else None, time.time()))
+            except Exception:
+                rows.append((line, None, None, None, None, None, time.time()))
+
+        conn = self.connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO events (line, event_type, slot, start_date, end_date, event_time, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(rows)
+
+    def last_event_id(self):
+        return self.connection.execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def events_since(self, last_id):
+        """
+        Returns (id, line) for every event added after last_id, oldest first.
+        """
+        return self.connection.execute(
+            "SELECT id, line FROM events WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+
+    def events_between(self, start, end, event_type=None):
+        """
+        Returns the submitted events overlapping the days start..end, using the date index.
+        """
+        query = "SELECT id, line FROM events WHERE start_date <= ? AND end_date >= ?"
+        params = [end.isoformat(), start.isoformat()]
+        if event_type is not None:
+            query += " AND event_type = ?"
+            params.append(event_type)
+        return self.connection.execute(query + " ORDER BY id", params).fetchall()
+
+    def replace_compiled(self, calendar, snapshot_generation=None):
+        """
+        Replaces the compiled schedule with the calendar's ranges in one transaction
+        and bumps the compiled generation so readers know to reload. snapshot_generation
+        records which compiled snapshot the rows came from (see compiled_snapshot).
+        """
+        rows = [(0, None, start.isoformat(), end.isoformat(), None) for start, end in calendar.holiday_ranges()]
+        for start, end, slot, (event_type, event_time) in calendar.exam_ranges():
+            rows.append((event_type, slot, start.isoformat(), end.isoformat(),
+                         event_time.strftime("%H:%M:%S") if event_time else None))
+
+        conn = self.connection
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM compiled")
+            conn.executemany(
+                "INSERT INTO compiled (event_type, slot, start_date, end_date, event_time) VALUES (?, ?, ?, ?, ?)", rows)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('compiled_generation', '1') "
+                "ON CONFLICT(key) DO UPDATE SET value = CAST(value AS INTEGER) + 1")
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('snapshot_generation', ?)",
+                         (str(snapshot_generation),))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def compiled_generation(self):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'compiled_generation'").fetchone()
+        return int(row[0]) if row else 0
+
+    def compiled_snapshot(self):
+        """
+        Generation of the compiled snapshot the compiled table was last filled from, None if never.
+        """
+        row = self.connection.execute("SELECT value FROM meta WHERE key = 'snapshot_generation'").fetchone()
+        return int(row[0]) if row and row[0] != "None" else None
+
+    def calendar_for(self, start, end=None):
+        """
+        Builds a ScheduleCalendar with only the compiled ranges overlapping start..end.
+        Exam times stay "HH:MM:SS" strings, the same as when final.txt is parsed.
+        """
+        end = end or start
+        calendar = ScheduleCalendar()
+        rows = self.connection.execute(
+            "SELECT event_type, slot, start_date, end_date, event_time FROM compiled "
+            "WHERE start_date <= ? AND end_date >= ?", (end.isoformat(), start.isoformat()))
+        for event_type, slot, start_date, end_date, event_time in rows:
+            if event_type == 0:
+                calendar.add_holiday(date.fromisoformat(start_date), date.fromisoformat(end_date))
+            else:
+                calendar.add_exam(slot, date.fromisoformat(start_date), date.fromisoformat(end_date), event_type, event_time)
+        return calendar
+
+    def import_text(self, input_file):
+        """
+        Migration path: copies every line of an existing input.txt into the events table.
+        """
+        with open(input_file, 'r') as file:
+            lines = [line for line in file if line.strip()]
+        count = self.add_events(lines)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('imported_from', ?)", (os.path.abspath(input_file),))
+        return count
+
+def open_store():
+    """
+    Returns the shared store if BELL_DB is set, otherwise None (plain text files are used).
+    """
+    return ScheduleStore(DB_FILE) if DB_FILE else None
+
+if __name__ == "__main__":
+    # python3 schedule_store.py migrate [input.txt]
+    # python3 schedule_store.py events dd-mm-yyyy dd-mm-yyyy [event_type]
+    if not DB_FILE:
+        sys.exit("Set BELL_DB to the database path first")
+    store = ScheduleStore(DB_FILE)
+    if len(sys.argv) >= 2 and sys.argv[1] == "migrate":
+        source = sys.argv[2] if len(sys.argv) > 2 else "input.txt"
+        print(f"Imported {store.import_text(source)} events from {source} into {DB_FILE}")
+    elif len(sys.argv) >= 4 and sys.argv[1] == "events":
+        start = parse_date(sys.argv[2]).date()
+        end = parse_date(sys.argv[3]).date()
+        event_type = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        for event_id, line in store.events_between(start, end, event_type):
+            print(f"{event_id}: {line}")
+    else:
+        sys.exit("Usage: schedule_store.py migrate [input.txt] | events FROM TO [event_type]")
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+from watcher import file_signature
+
+def atomic_write(path, content):
+    """
+    Writes content to a temp file next to path, fsyncs it and renames it over path,
+    so readers see either the old file or the new one and never a half-written one.
+    """
+    data = content.encode() if isinstance(content, str) else content
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(data)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+    # Make the rename itself survive a power cut
+    dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def read_manifest(manifest_path):
+    try:
+        with open(manifest_path, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, ValueError):
+        return {"generation": 0, "files": {}}
+
+def read_generation(manifest_path):
+    """
+    Generation of the last compiled snapshot, 0 if nothing was compiled yet.
+    Readers keep their parsed copy until this number changes.
+    """
+    return read_manifest(manifest_path)["generation"]
+
+def write_snapshot(manifest_path, files):
+    """
+    Writes a compiled snapshot. files maps each output path to its new content.
+    A file is only rewritten when its content hash changed (or it was modified
+    behind our back); if anything was written the generation is bumped.
+    Returns (generation, changed).
+    """
+    manifest = read_manifest(manifest_path)
+    changed = False
+    for path, content in files.items():
+        data = content.encode() if isinstance(content, str) else content
+        digest = hashlib.sha256(data).hexdigest()
+        previous = manifest["files"].get(path)
+        if previous and previous["sha256"] == digest and previous["signature"] == list(file_signature(path) or []):
+            continue
+        atomic_write(path, data)
+        manifest["files"][path] = {"sha256": digest, "signature": list(file_signature(path))}
+        changed = True
+
+    if changed:
+        manifest["generation"] += 1
+        atomic_write(manifest_path, json.dumps(manifest, indent=1))
+    return manifest["generation"], changed
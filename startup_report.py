@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+import os
+import re
+import subprocess
+import sys
+import time
+
+STARTUP_BUDGET_SECONDS = 2.0  # A daemon must be ready this long after its interpreter started
+DEFAULT_MODULES = ["relay", "bell", "processing", "app"]
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+def process_age():
+    """
+    Seconds since this process was started, read from /proc (Linux only).
+    """
+    with open("/proc/self/stat") as file:
+        start_ticks = int(file.read().rsplit(")", 1)[1].split()[19])
+    with open("/proc/uptime") as file:
+        uptime = float(file.read().split()[0])
+    return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+
+def peak_rss_mb():
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # ru_maxrss is in KiB on Linux
+
+def report_ready(name):
+    """
+    Prints how long this daemon took from interpreter start to ready, and its peak memory.
+    Called by the daemons when they are started with --startup-report.
+    """
+    try:
+        age = process_age()
+    except OSError:
+        print(f"[startup] {name}: ready, peak RSS {peak_rss_mb():.1f} MB")
+        return
+    verdict = "within" if age <= STARTUP_BUDGET_SECONDS else "OVER"
+    print(f"[startup] {name}: ready after {age:.2f}s ({verdict} the {STARTUP_BUDGET_SECONDS:.1f}s budget), "
+          f"peak RSS {peak_rss_mb():.1f} MB", flush=True)
+
+def measure_import(module, top=5):
+    """
+    Imports module in a fresh interpreter with -X importtime.
+    Returns (seconds, peak RSS in MB, [(self seconds, imported module)], error).
+    """
+    started = time.perf_counter()
+    child = subprocess.Popen(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+    )
+    stderr = child.stderr.read().decode(errors="replace")
+    _, status, usage = os.wait4(child.pid, 0)
+    child.returncode = os.waitstatus_to_exitcode(status)
+    elapsed = time.perf_counter() - started
+
+    slowest = []
+    error = None
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            slowest.append((int(match.group(1)) / 1e6, match.group(4)))
+        elif line.strip() and not line.startswith("import time:"):
+            error = line.strip()  # Last line of a traceback
+    slowest.sort(reverse=True)
+    return elapsed, usage.ru_maxrss / 1024, slowest[:top], error if child.returncode else None
+
+def main(modules):
+    print(f"{'module':<16}{'import':>10}{'peak RSS':>12}  slowest imports")
+    for module in modules:
+        elapsed, rss, slowest, error = measure_import(module)
+        if error:
+            print(f"{module:<16}{'failed':>10}{rss:>9.1f} MB  {error}")
+            continue
+        flag = "" if elapsed <= STARTUP_BUDGET_SECONDS else "  << over budget"
+        details = ", ".join(f"{name} {seconds * 1000:.0f}ms" for seconds, name in slowest)
+        print(f"{module:<16}{elapsed:>9.2f}s{rss:>9.1f} MB  {details}{flag}")
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or DEFAULT_MODULES)
@@ -3,35 +3,7 @@ import subprocess
 from datetime import datetime, timedelta
 import os
 import csv
-
-def parse_event_line(line):
-    parts = line.strip().split(',')
-    event_type = int(parts[0])
-    
-    if event_type in (1, 2):  # Mid-semester or End-semester
-        slot = int(parts[1])
-        start_date = datetime.strptime(parts[2], "%d-%m-%Y")
-        
-        if len(parts) > 4:
-            end_date = datetime.strptime(parts[3], "%d-%m-%Y")
-            event_time = datetime.strptime(parts[4], "%H:%M:%S").time()
-        elif len(parts) > 3:
-            try:
-                end_date = datetime.strptime(parts[3], "%d-%m-%Y")
-                event_time = None
-            except ValueError:
-                end_date = start_date
-                event_time = datetime.strptime(parts[3], "%H:%M:%S").time()
-        else:
-            end_date = start_date
-            event_time = None
-        
-        return event_type, slot, start_date, end_date, event_time
-    
-    else:  # Holiday
-        start_date = datetime.strptime(parts[1], "%d-%m-%Y")
-        end_date = datetime.strptime(parts[2], "%d-%m-%Y") if len(parts) > 2 else start_date
-        return event_type, None, start_date, end_date, None
+from normalize import parse_event_line
 
 def read_and_process_events(input_file):
     event_dict = {}
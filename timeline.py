@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+import sys
+import time
+from datetime import datetime
+import numpy as np
+from bell_timetable import saturday_timings, weekday_timings, EXAM_OFFSETS, REASON_REGULAR, REASON_NAMES
+from normalize import parse_time
+
+MONDAY = np.datetime64("1970-01-05", "D")  # Any Monday, weekday numbers count from here
+SATURDAY = 5
+
+def _time_of_day(event_time):
+    if isinstance(event_time, str):
+        event_time = parse_time(event_time)  # final.txt and the store keep "HH:MM:SS" strings
+    return event_time.hour * 3600 + event_time.minute * 60 + event_time.second
+
+SATURDAY_OFFSETS = np.array([_time_of_day(t) for t in saturday_timings], dtype="timedelta64[s]")
+WEEKDAY_OFFSETS = np.array([_time_of_day(t) for t in weekday_timings], dtype="timedelta64[s]")
+
+# Row n holds the offsets of exam type n, padded with NaT so every profile has the same width
+PROFILE_WIDTH = max(len(offsets) for offsets in EXAM_OFFSETS.values())
+EXAM_PROFILES = np.full((max(EXAM_OFFSETS) + 1, PROFILE_WIDTH), np.timedelta64("NaT"), dtype="timedelta64[s]")
+for _event_type, _offsets in EXAM_OFFSETS.items():
+    EXAM_PROFILES[_event_type, :len(_offsets)] = [int(offset.total_seconds()) for offset in _offsets]
+
+def _expand_ranges(starts, ends, first=None, last=None):
+    """
+    Expands inclusive day ranges into one entry per day in a single batch.
+    Returns (days, index of the range each day came from). Ranges are clipped to first..last.
+    """
+    starts = np.array(starts, dtype="datetime64[D]")
+    ends = np.array(ends, dtype="datetime64[D]")
+    if first is not None:
+        starts = np.maximum(starts, np.datetime64(first, "D"))
+    if last is not None:
+        ends = np.minimum(ends, np.datetime64(last, "D"))
+    lengths = np.maximum((ends - starts).astype("int64") + 1, 0)
+    source = np.repeat(np.arange(len(starts)), lengths)
+    within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return starts[source] + within.astype("timedelta64[D]"), source
+
+class TermTimeline:
+    """
+    Every bell of a term as NumPy arrays, computed for all exam days x slots x offsets at once.
+    first/last (dates) limit the days; without them the calendar's whole extent is used and
+    regular bells are left out, since they repeat forever.
+
+    holidays        datetime64[D], one entry per holiday day
+    exam_days       datetime64[D], one entry per exam day and slot, sorted by day then slot
+    exam_slots      slot of each exam row
+    exam_types      1 (midsem) or 2 (endsem)
+    exam_times      datetime64[s], shape (rows, PROFILE_WIDTH), NaT where a profile is shorter
+    regular_times   datetime64[s], the timetable bells on days without holidays or exams
+    """
+    def __init__(self, calendar, first=None, last=None):
+        holiday_ranges = calendar.holiday_ranges()
+        self.holidays, _ = _expand_ranges([r[0] for r in holiday_ranges], [r[1] for r in holiday_ranges], first, last)
+
+        ranges = [r for r in calendar.exam_ranges() if r[3][0] in EXAM_OFFSETS]  # Holidays already cut out
+        days, source = _expand_ranges([r[0] for r in ranges], [r[1] for r in ranges], first, last)
+        slots = np.array([r[2] for r in ranges], dtype="int64")[source]
+        types = np.array([r[3][0] for r in ranges], dtype="int64")[source]
+        order = np.lexsort((slots, days))
+        self.exam_days, self.exam_slots, self.exam_types = days[order], slots[order], types[order]
+
+        # Exam rows without a start time (None, or "" from final.txt) still replace the regular
+        # bells, they just ring nothing themselves
+        timed = np.array([bool(r[3][1]) for r in ranges], dtype=bool)[source][order]
+        base_seconds = np.array([_time_of_day(r[3][1]) if r[3][1] else 0 for r in ranges],
+                                dtype="int64")[source][order]
+        base = self.exam_days.astype("datetime64[s]") + base_seconds.astype("timedelta64[s]")
+        self.exam_times = base[:, None] + EXAM_PROFILES[self.exam_types]
+        self.exam_times[~timed] = np.datetime64("NaT")
+
+        self.regular_times = np.empty(0, dtype="datetime64[s]")
+        if first is not None and last is not None:
+            all_days = np.arange(np.datetime64(first, "D"), np.datetime64(last, "D") + 1)
+            busy = np.isin(all_days, np.concatenate([self.holidays, self.exam_days]))
+            weekday = (all_days - MONDAY).astype("int64") % 7
+            saturdays = all_days[~busy & (weekday == SATURDAY)].astype("datetime64[s]")
+            weekdays = all_days[~busy & (weekday < SATURDAY)].astype("datetime64[s]")
+            self.regular_times = np.sort(np.concatenate([
+                (weekdays[:, None] + WEEKDAY_OFFSETS).ravel(),
+                (saturdays[:, None] + SATURDAY_OFFSETS).ravel(),
+            ]))
+
+    def fire_schedule(self):
+        """
+        Flattens the term into sorted, de-duplicated bells.
+        Returns (fire times as datetime64[s], zones, reasons); regular bells have zone 0,
+        and when two slots share a second the lower slot is kept.
+        """
+        times = np.concatenate([self.regular_times, self.exam_times.ravel()])
+        zones = np.concatenate([np.zeros(len(self.regular_times), dtype="int64"),
+                                np.repeat(self.exam_slots, self.exam_times.shape[1])])
+        reasons = np.concatenate([np.full(len(self.regular_times), REASON_REGULAR, dtype="int64"),
+                                  np.repeat(self.exam_types, self.exam_times.shape[1])])
+        present = ~np.isnat(times)
+        times, zones, reasons = times[present], zones[present], reasons[present]
+        order = np.lexsort((zones, times))
+        times, zones, reasons = times[order], zones[order], reasons[order]
+        first_of_second = np.ones(len(times), dtype=bool)
+        first_of_second[1:] = times[1:] != times[:-1]
+        return times[first_of_second], zones[first_of_second], reasons[first_of_second]
+
+    def csv_rows(self):
+        """
+        Yields the bell_events.csv rows in date order: one per holiday day and one per timed exam slot.
+        """
+        holiday_rows = [(day, -1, "Holiday", "No bell ringing") for day in self.holidays.tolist()]
+        exam_rows = []
+        labels = np.datetime_as_string(self.exam_times, unit="s")  # "yyyy-mm-ddTHH:MM:SS" or "NaT"
+        for day, slot, event_type, row in zip(self.exam_days.tolist(), self.exam_slots.tolist(),
+                                              self.exam_types.tolist(), labels.tolist()):
+            timings = [label[11:] for label in row if label != "NaT"]
+            if timings:
+                exam_rows.append((day, slot, REASON_NAMES[event_type].capitalize(), ", ".join(timings)))
+        for day, _, row_type, timings in sorted(holiday_rows + exam_rows, key=lambda row: (row[0], row[1])):
+            yield row_type, f"{day.day:02d}-{day.month:02d}-{day.year:04d}", timings
+
+def to_epoch(times):
+    """
+    Converts naive local datetime64[s] values to Unix epoch seconds, looking up the
+    UTC offset once per distinct day (an offset change in the middle of a day is not handled).
+    """
+    if not len(times):
+        return np.empty(0, dtype="int64")
+    days, inverse = np.unique(times.astype("datetime64[D]"), return_inverse=True)
+    offsets = np.array([datetime(day.year, day.month, day.day, 12).astimezone().utcoffset().total_seconds()
+                        for day in days.tolist()], dtype="int64")
+    return times.astype("int64") - offsets[inverse]
+
+def _check_timeless_exam():
+    """
+    An exam row without a time, as final.txt writes it ("2,2,21-10-2026,22-10-2026,"), must
+    ring nothing on its days and leave the regular bells of the other days alone.
+    """
+    from datetime import date
+    from schedule_intervals import ScheduleCalendar
+
+    calendar = ScheduleCalendar()
+    calendar.add_exam(2, date(2026, 10, 21), date(2026, 10, 22), 2, "")
+    calendar.add_exam(3, date(2026, 10, 23), date(2026, 10, 23), 1, None)
+    times, _, _ = TermTimeline(calendar, date(2026, 10, 20), date(2026, 10, 23)).fire_schedule()
+    days = set(times.astype("datetime64[D]").tolist())
+    assert days == {date(2026, 10, 20)}, sorted(days)
+    print("timeline: timeless exam rows ring nothing and keep the regular bells of other days")
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--check"]:
+        _check_timeless_exam()
+        sys.exit(0)
+    # python3 timeline.py [input.txt]: previews every exam bell of the term and how long it took
+    from processing import read_and_process_events
+    calendar = read_and_process_events(sys.argv[1] if len(sys.argv) > 1 else "input.txt")
+    started = time.perf_counter()
+    timeline = TermTimeline(calendar)
+    times, zones, reasons = timeline.fire_schedule()
+    elapsed = time.perf_counter() - started
+    for fire_time, zone, reason in zip(times.tolist(), zones.tolist(), reasons.tolist()):
+        print(f"{fire_time.strftime('%d-%m-%Y %H:%M:%S')}  {REASON_NAMES[reason]:<8} slot {zone}")
+    print(f"{len(times)} bells on {len(timeline.exam_days)} exam slot-days, {len(timeline.holidays)} holidays, "
+          f"computed in {elapsed * 1000:.1f} ms")
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+logger = logging.getLogger("timer_service")
+
+class TimerService:
+    """
+    Delayed bells kept in a single heap and served by a single worker thread,
+    so thousands of pending timers cost no extra threads. Every change is appended
+    to a JSON-lines journal, which is replayed on start and compacted once it is
+    mostly made of finished timers.
+    """
+    def __init__(self, path, action, catch_up_window=60, max_wait=30):
+        self.path = path
+        self.action = action  # Called with the timer dict when it is due
+        self.catch_up_window = catch_up_window  # Overdue timers older than this are dropped on load
+        self.max_wait = max_wait  # Re-check at least this often in case the wall clock is changed
+        self.condition = threading.Condition()
+        self.heap = []  # (due, id), cancelled entries are skipped lazily
+        self.timers = {}  # id -> timer dict, only pending timers
+        self.journal_lines = 0
+        self.started = False
+
+    def start(self):
+        with self.condition:
+            if self.started:
+                return
+            self.started = True
+            self._load()
+            self._compact()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def add(self, delay_seconds, duration=5, source=""):
+        timer = {
+            "id": uuid.uuid4().hex[:12],
+            "due": time.time() + delay_seconds,
+            "duration": duration,
+            "source": source,
+            "created_at": time.time(),
+        }
+        with self.condition:
+            self.timers[timer["id"]] = timer
+            heapq.heappush(self.heap, (timer["due"], timer["id"]))
+            self._journal([{"add": timer}])
+            self.condition.notify()
+        return dict(timer)
+
+    def list(self):
+        with self.condition:
+            return sorted((dict(timer) for timer in self.timers.values()), key=lambda timer: timer["due"])
+
+    def cancel(self, timer_id):
+        with self.condition:
+            timer = self.timers.pop(timer_id, None)
+            if timer is None:
+                return None
+            self._journal([{"done": timer_id}])
+            self.condition.notify()
+        return timer
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while True:
+                    # Drop heap entries of cancelled timers
+                    while self.heap and self.heap[0][1] not in self.timers:
+                        heapq.heappop(self.heap)
+                    if not self.heap:
+                        self.condition.wait()
+                        continue
+                    remaining = self.heap[0][0] - time.time()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(min(remaining, self.max_wait))
+
+                # Take everything that is due in one go so the journal is written once
+                due = []
+                now = time.time()
+                while self.heap and self.heap[0][0] <= now:
+                    _, timer_id = heapq.heappop(self.heap)
+                    if timer_id in self.timers:
+                        due.append(self.timers.pop(timer_id))
+                self._journal([{"done": timer["id"]} for timer in due])
+
+            for timer in due:
+                try:
+                    self.action(timer)
+                except Exception as e:
+                    logger.error(f"Error firing timer {timer['id']}: {e}")
+
+    def _load(self):
+        saved = {}
+        try:
+            with open(self.path, 'r') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # Torn last line after a power cut
+                    if "add" in record:
+                        saved[record["add"]["id"]] = record["add"]
+                    elif "done" in record:
+                        saved.pop(record["done"], None)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable timer file {self.path}: {e}")
+            return
+
+        now = time.time()
+        for timer in saved.values():
+            if timer["due"] < now - self.catch_up_window:
+                logger.warning(f"Dropping timer {timer['id']}, it was due while the server was down")
+                continue
+            self.timers[timer["id"]] = timer
+            heapq.heappush(self.heap, (timer["due"], timer["id"]))
+
+    def _journal(self, records):
+        try:
+            with open(self.path, 'a') as file:
+                file.write("".join(json.dumps(record) + "\n" for record in records))
+            self.journal_lines += len(records)
+        except Exception as e:
+            logger.error(f"Error saving timers to {self.path}: {e}")
+        if self.journal_lines > 2 * len(self.timers) + 100:
+            self._compact()
+
+    def _compact(self):
+        """
+        Rewrites the journal with only the pending timers.
+        """
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as file:
+                for timer in self.timers.values():
+                    file.write(json.dumps({"add": timer}) + "\n")
+            os.replace(tmp_path, self.path)
+            self.journal_lines = len(self.timers)
+        except Exception as e:
+            logger.error(f"Error compacting timers in {self.path}: {e}")
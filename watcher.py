@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import logging
+import os
+import time
+
+logger = logging.getLogger("watcher")
+
+def file_signature(path):
+    """
+    Returns a cheap fingerprint of the file (inode, size, mtime) without reading it.
+    Returns None if the file does not exist.
+    """
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+def watch_file(path, on_change, poll_interval=0.5, settle_time=0.3, on_ready=None):
+    """
+    Calls on_change() once at startup and then again every time the file changes.
+    Only a stat() is done per poll, so nothing is read or written while the file is idle.
+    """
+    watch(lambda: file_signature(path), on_change, path, poll_interval, settle_time, on_ready)
+
+def watch(get_signature, on_change, name, poll_interval=0.5, settle_time=0.3, on_ready=None):
+    """
+    Calls on_change() once at startup and then again every time get_signature() returns
+    something new. A burst of writes is coalesced into a single call: we wait until the
+    signature has stayed the same for settle_time seconds before calling on_change().
+    on_ready() is called once, after the startup call.
+    """
+    def run():
+        try:
+            on_change()
+        except Exception as e:
+            logger.error(f"Error while handling change of {name}: {e}")
+
+    last_signature = get_signature()
+    run()
+    if on_ready:
+        on_ready()
+    while True:
+        time.sleep(poll_interval)
+        signature = get_signature()
+        if signature == last_signature:
+            continue
+
+        # Let the writer finish before rebuilding
+        while True:
+            time.sleep(settle_time)
+            settled = get_signature()
+            if settled == signature:
+                break
+            signature = settled
+
+        last_signature = signature
+        run()
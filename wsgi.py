@@ -1,4 +1,9 @@
 from app import app
+from log_config import setup_logging
+import profiling
+
+setup_logging("app")
+profiling.install("app")
 
 if __name__ == "__main__":
     app.run()